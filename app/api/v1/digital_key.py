@@ -1,27 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.db.database import SessionLocal, engine
-from app.models.digital_key import Base
+from app.db.deps import get_db
 from app.schemas.digital_key import DigitalKeyCreate, DigitalKeyResponse
 from app.services import digital_key_service
-from app.utils.cloud import upload_data_to_cloud, list_all_uploads, download_data_from_cloud
-
-Base.metadata.create_all(bind=engine)
+from app.utils.cloud import upload_data_to_cloud, iter_uploads, download_data_from_cloud
+from app.utils.cache import cache
+from app.utils.streaming import stream_json_array
 
 router = APIRouter(prefix="/digital-keys", tags=["Digital Keys"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/", response_model=DigitalKeyResponse)
 def create_digital_key(digital_key: DigitalKeyCreate, db: Session = Depends(get_db)):
     """Create a new digital key and upload it to local cloud storage.
     
     Validates that the machine_id exists before creating the key.
+    The cloud upload runs in the background and does not delay the response.
     """
     result = digital_key_service.create_digital_key(db, digital_key)
     
@@ -31,23 +25,55 @@ def create_digital_key(digital_key: DigitalKeyCreate, db: Session = Depends(get_
     
     return result
 
+@router.post("/batch", response_model=list[DigitalKeyResponse])
+def create_digital_keys_batch(digital_keys: list[DigitalKeyCreate], db: Session = Depends(get_db)):
+    """Create several digital keys in one request.
+    
+    Every machine_id is validated first; the whole batch is rejected if any
+    is missing. Cloud uploads for the new keys run in parallel in the background.
+    """
+    result = digital_key_service.create_digital_keys_bulk(db, digital_keys)
+    
+    # Check if validation failed
+    if isinstance(result, dict) and "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    
+    return result
+
 @router.get("/{key_id}", response_model=DigitalKeyResponse)
 def read_digital_key(key_id: int, db: Session = Depends(get_db)):
     """Retrieve a digital key by ID."""
+    cached = cache.get(f"dk:{key_id}")
+    if cached is not None:
+        return cached
+    
+    generation = cache.generation()
     db_digital_key = digital_key_service.get_digital_key_by_id(db, key_id)
     if db_digital_key is None:
         raise HTTPException(status_code=404, detail="Digital Key not found")
-    return db_digital_key
+    
+    response = DigitalKeyResponse.model_validate(db_digital_key).model_dump()
+    cache.set(f"dk:{key_id}", response, generation)
+    return response
 
 @router.get("/", response_model=list[DigitalKeyResponse])
-def read_all_digital_keys(db: Session = Depends(get_db)):
-    """Retrieve all digital keys."""
-    return digital_key_service.get_all_digital_keys(db)
+def read_all_digital_keys(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    after_id: int | None = Query(None, ge=0),
+    db: Session = Depends(get_db)
+):
+    """Retrieve digital keys ordered by ID.
+    
+    Pass the last ID of the previous page as after_id for keyset pagination,
+    which stays fast on deep pages; skip/limit offset pagination also works.
+    """
+    return digital_key_service.get_all_digital_keys(db, skip=skip, limit=limit, after_id=after_id)
 
 @router.get("/machine/{machine_id}", response_model=list[DigitalKeyResponse])
-def get_keys_by_machine(machine_id: int, db: Session = Depends(get_db)):
-    """Retrieve all digital keys associated with a specific machine."""
-    keys = digital_key_service.get_digital_keys_by_machine(db, machine_id)
+def get_keys_by_machine(machine_id: int, skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    """Retrieve digital keys associated with a specific machine, with pagination."""
+    keys = digital_key_service.get_digital_keys_by_machine(db, machine_id, skip=skip, limit=limit)
     if not keys:
         raise HTTPException(status_code=404, detail="No digital keys found for this machine")
     return keys
@@ -61,9 +87,9 @@ def get_key_by_name(key_name: str, db: Session = Depends(get_db)):
     return key
 
 @router.get("/owner/{owner}", response_model=list[DigitalKeyResponse])
-def get_keys_by_owner(owner: str, db: Session = Depends(get_db)):
-    """Retrieve all digital keys owned by a specific user."""
-    keys = digital_key_service.get_digital_keys_by_owner(db, owner)
+def get_keys_by_owner(owner: str, skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    """Retrieve digital keys owned by a specific user, with pagination."""
+    keys = digital_key_service.get_digital_keys_by_owner(db, owner, skip=skip, limit=limit)
     if not keys:
         raise HTTPException(status_code=404, detail="No digital keys found for this owner")
     return keys
@@ -84,6 +110,7 @@ def update_digital_key(key_id: int, digital_key: DigitalKeyCreate, db: Session =
     if isinstance(result, dict) and "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
     
+    cache.invalidate(f"dk:{key_id}")
     return result
 
 @router.delete("/{key_id}", response_model=dict)
@@ -92,15 +119,16 @@ def delete_digital_key(key_id: int, db: Session = Depends(get_db)):
     success = digital_key_service.delete_digital_key(db, key_id)
     if not success:
         raise HTTPException(status_code=404, detail="Digital Key not found")
+    cache.invalidate(f"dk:{key_id}")
     return {"detail": "Digital Key deleted successfully"}
 
-@router.get("/cloud/uploads/list", response_model=list)
+@router.get("/cloud/uploads/list")
 def list_cloud_uploads():
-    """List all digital keys uploaded to local cloud storage."""
-    uploads = list_all_uploads()
-    if not uploads:
-        return {"message": "No uploads found"}
-    return uploads
+    """List all digital keys uploaded to local cloud storage.
+    
+    The JSON array is streamed while the bucket is scanned.
+    """
+    return StreamingResponse(stream_json_array(iter_uploads()), media_type="application/json")
 
 @router.get("/cloud/download/{key_id}/{key_name}", response_model=dict)
 def download_from_cloud(key_id: int, key_name: str):
@@ -1,21 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from app.db.database import SessionLocal, engine
-from app.models.machine import Base, Machine
+from app.db.deps import get_db
+from app.models.machine import Machine, MachineType
 from app.schemas.permission import MachineCreate, MachineUpdate, MachineResponse
 from app.services import machine_service
-
-Base.metadata.create_all(bind=engine)
+from app.utils.cache import cache
 
 router = APIRouter(prefix="/machines", tags=["Machines"])
 
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Case-insensitive name -> MachineType lookup for the by-type endpoint
+_MACHINE_TYPES_BY_NAME = {machine_type.name: machine_type for machine_type in MachineType}
 
 
 @router.post("/", response_model=MachineResponse)
@@ -26,16 +20,26 @@ def create_machine(machine: MachineCreate, db: Session = Depends(get_db)):
     if existing_machine:
         raise HTTPException(status_code=400, detail="Machine name already exists")
     
-    return machine_service.create_machine(db, machine)
+    db_machine = machine_service.create_machine(db, machine)
+    cache.invalidate_prefix("mach:list:")
+    return db_machine
 
 
 @router.get("/{machine_id}", response_model=MachineResponse)
 def read_machine(machine_id: int, db: Session = Depends(get_db)):
     """Get a machine by ID."""
+    cached = cache.get(f"mach:{machine_id}")
+    if cached is not None:
+        return cached
+    
+    generation = cache.generation()
     db_machine = machine_service.get_machine_by_id(db, machine_id)
     if db_machine is None:
         raise HTTPException(status_code=404, detail="Machine not found")
-    return db_machine
+    
+    response = MachineResponse.model_validate(db_machine).model_dump()
+    cache.set(f"mach:{machine_id}", response, generation)
+    return response
 
 
 @router.get("/name/{machine_name}", response_model=MachineResponse)
@@ -50,18 +54,27 @@ def read_machine_by_name(machine_name: str, db: Session = Depends(get_db)):
 @router.get("/", response_model=list[MachineResponse])
 def read_all_machines(skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
     """Get all machines with pagination."""
-    return machine_service.get_all_machines(db, skip=skip, limit=limit)
+    cache_key = f"mach:list:{skip}:{limit}"
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    generation = cache.generation()
+    response = [
+        MachineResponse.model_validate(m).model_dump()
+        for m in machine_service.get_all_machines(db, skip=skip, limit=limit)
+    ]
+    cache.set(cache_key, response, generation)
+    return response
 
 
 @router.get("/type/{machine_type}", response_model=list[MachineResponse])
 def read_machines_by_type(machine_type: str, db: Session = Depends(get_db)):
     """Get all machines of a specific type."""
-    try:
-        from app.models.machine import MachineType
-        machine_type_enum = MachineType[machine_type.upper()]
-        return machine_service.get_machines_by_type(db, machine_type_enum)
-    except KeyError:
+    machine_type_enum = _MACHINE_TYPES_BY_NAME.get(machine_type.upper())
+    if machine_type_enum is None:
         raise HTTPException(status_code=400, detail="Invalid machine type")
+    return machine_service.get_machines_by_type(db, machine_type_enum)
 
 
 @router.get("/active/", response_model=list[MachineResponse])
@@ -76,6 +89,8 @@ def update_machine(machine_id: int, machine_update: MachineUpdate, db: Session =
     db_machine = machine_service.update_machine(db, machine_id, machine_update)
     if db_machine is None:
         raise HTTPException(status_code=404, detail="Machine not found")
+    cache.invalidate(f"mach:{machine_id}")
+    cache.invalidate_prefix("mach:list:")
     return db_machine
 
 
@@ -85,4 +100,6 @@ def delete_machine(machine_id: int, db: Session = Depends(get_db)):
     success = machine_service.delete_machine(db, machine_id)
     if not success:
         raise HTTPException(status_code=404, detail="Machine not found")
+    cache.invalidate(f"mach:{machine_id}")
+    cache.invalidate_prefix("mach:list:")
     return {"detail": "Machine deleted successfully"}
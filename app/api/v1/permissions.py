@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session, joinedload
-from app.db.database import SessionLocal, engine
-from app.models.permission import Base, UserMachinePermission
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, contains_eager
+from app.db.deps import get_db
+from app.models.permission import UserMachinePermission
 from app.models.user import User
 from app.models.machine import Machine
 from app.schemas.access import (
@@ -11,21 +12,12 @@ from app.schemas.access import (
     UserAccessResponse
 )
 from app.services import permission_service
-from app.utils.cloud import list_all_permissions, download_permission_from_cloud
-
-Base.metadata.create_all(bind=engine)
+from app.utils.cloud import iter_permissions, download_permission_from_cloud
+from app.utils.streaming import stream_json_array
 
 router = APIRouter(prefix="/permissions", tags=["Permissions"])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 @router.post("/grant", response_model=UserMachinePermissionResponse)
 def grant_access(permission: UserMachinePermissionCreate, db: Session = Depends(get_db)):
     """Grant a user access to a machine with a digital key.
@@ -36,30 +28,28 @@ def grant_access(permission: UserMachinePermissionCreate, db: Session = Depends(
     3. Digital key exists and belongs to the machine
     4. Permission doesn't already exist
     """
-    # Validate user exists
-    user = db.query(User).filter(User.id == permission.user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    # Grant access (the service checks all of the above in a single query)
+    result = permission_service.grant_user_machine_access(db, permission)
     
-    # Validate machine exists
-    machine = db.query(Machine).filter(Machine.id == permission.machine_id).first()
-    if not machine:
-        raise HTTPException(status_code=404, detail="Machine not found")
+    # Check if validation failed
+    if isinstance(result, dict) and "error" in result:
+        raise HTTPException(status_code=result.get("status_code", 400), detail=result["error"])
     
-    # Check if permission already exists
-    existing_permission = db.query(UserMachinePermission).filter(
-        UserMachinePermission.user_id == permission.user_id,
-        UserMachinePermission.machine_id == permission.machine_id
-    ).first()
-    if existing_permission:
-        raise HTTPException(status_code=400, detail="Permission already exists for this user-machine pair")
+    return result
+
+
+@router.post("/grant/batch", response_model=list[UserMachinePermissionResponse])
+def grant_access_batch(permissions: list[UserMachinePermissionCreate], db: Session = Depends(get_db)):
+    """Grant several permissions in one request.
     
-    # Grant access (this will validate digital key belongs to machine)
-    result = permission_service.grant_user_machine_access(db, permission)
+    Each item is validated like /grant; the whole batch is rejected if any
+    item fails, so either every permission is created or none is.
+    """
+    result = permission_service.grant_user_machine_access_bulk(db, permissions)
     
     # Check if validation failed
     if isinstance(result, dict) and "error" in result:
-        raise HTTPException(status_code=400, detail=result["error"])
+        raise HTTPException(status_code=result.get("status_code", 400), detail=result["error"])
     
     return result
 
@@ -74,25 +64,27 @@ def read_permission(permission_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/user/{user_id}", response_model=list[UserMachinePermissionResponse])
-def get_user_permissions(user_id: int, db: Session = Depends(get_db)):
-    """Get all permissions for a user."""
-    # Validate user exists
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+def get_user_permissions(user_id: int, skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    """Get active permissions for a user, with pagination."""
+    permissions = permission_service.get_user_permissions(db, user_id, skip=skip, limit=limit)
+    
+    # An empty result is ambiguous, so only then check that the user exists
+    if not permissions and db.query(User.id).filter(User.id == user_id).first() is None:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return permission_service.get_user_permissions(db, user_id)
+    return permissions
 
 
 @router.get("/machine/{machine_id}", response_model=list[UserMachinePermissionResponse])
-def get_machine_permissions(machine_id: int, db: Session = Depends(get_db)):
-    """Get all permissions for a machine."""
-    # Validate machine exists
-    machine = db.query(Machine).filter(Machine.id == machine_id).first()
-    if not machine:
+def get_machine_permissions(machine_id: int, skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    """Get active permissions for a machine, with pagination."""
+    permissions = permission_service.get_machine_permissions(db, machine_id, skip=skip, limit=limit)
+    
+    # An empty result is ambiguous, so only then check that the machine exists
+    if not permissions and db.query(Machine.id).filter(Machine.id == machine_id).first() is None:
         raise HTTPException(status_code=404, detail="Machine not found")
     
-    return permission_service.get_machine_permissions(db, machine_id)
+    return permissions
 
 
 @router.get("/user/{user_id}/machine/{machine_id}", response_model=UserMachinePermissionResponse)
@@ -147,75 +139,78 @@ def delete_permission(permission_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/access/user/{user_id}", response_model=list[UserAccessResponse])
-def get_user_access_summary(user_id: int, db: Session = Depends(get_db)):
-    """Get a summary of a user's access to all machines."""
-    # Validate user exists
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    permissions = db.query(UserMachinePermission).filter(
+def get_user_access_summary(user_id: int, skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    """Get a paginated summary of a user's access to machines."""
+    permissions = db.query(UserMachinePermission).join(
+        UserMachinePermission.user
+    ).join(
+        UserMachinePermission.machine
+    ).options(
+        contains_eager(UserMachinePermission.user),
+        contains_eager(UserMachinePermission.machine)
+    ).filter(
         UserMachinePermission.user_id == user_id,
         UserMachinePermission.is_active == True
-    ).all()
+    ).order_by(UserMachinePermission.id).offset(skip).limit(limit).all()
     
-    access_list = []
-    for permission in permissions:
-        machine = db.query(Machine).filter(Machine.id == permission.machine_id).first()
-        if machine:
-            access_list.append(UserAccessResponse(
-                user_id=user.id,
-                username=user.username,
-                machine_id=machine.id,
-                machine_name=machine.machine_name,
-                permission_level=permission.permission_level,
-                is_active=permission.is_active,
-                created_at=permission.created_at
-            ))
+    # An empty result is ambiguous, so only then check that the user exists
+    if not permissions and db.query(User.id).filter(User.id == user_id).first() is None:
+        raise HTTPException(status_code=404, detail="User not found")
     
-    return access_list
+    return [
+        UserAccessResponse(
+            user_id=permission.user.id,
+            username=permission.user.username,
+            machine_id=permission.machine.id,
+            machine_name=permission.machine.machine_name,
+            permission_level=permission.permission_level,
+            is_active=permission.is_active,
+            created_at=permission.created_at
+        )
+        for permission in permissions
+    ]
 
 
 @router.get("/access/machine/{machine_id}", response_model=list[dict])
-def get_machine_access_summary(machine_id: int, db: Session = Depends(get_db)):
-    """Get a summary of all users' access to a machine."""
-    # Validate machine exists
-    machine = db.query(Machine).filter(Machine.id == machine_id).first()
-    if not machine:
-        raise HTTPException(status_code=404, detail="Machine not found")
-    
-    permissions = db.query(UserMachinePermission).filter(
+def get_machine_access_summary(machine_id: int, skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    """Get a paginated summary of users' access to a machine."""
+    permissions = db.query(UserMachinePermission).join(
+        UserMachinePermission.user
+    ).options(
+        contains_eager(UserMachinePermission.user)
+    ).filter(
         UserMachinePermission.machine_id == machine_id,
         UserMachinePermission.is_active == True
-    ).all()
+    ).order_by(UserMachinePermission.id).offset(skip).limit(limit).all()
     
-    access_list = []
-    for permission in permissions:
-        user = db.query(User).filter(User.id == permission.user_id).first()
-        if user:
-            access_list.append({
-                "user_id": user.id,
-                "username": user.username,
-                "user_type": user.user_type,
-                "permission_level": permission.permission_level,
-                "is_active": permission.is_active,
-                "created_at": permission.created_at
-            })
+    # An empty result is ambiguous, so only then check that the machine exists
+    if not permissions and db.query(Machine.id).filter(Machine.id == machine_id).first() is None:
+        raise HTTPException(status_code=404, detail="Machine not found")
     
-    return access_list
+    return [
+        {
+            "user_id": permission.user.id,
+            "username": permission.user.username,
+            "user_type": permission.user.user_type,
+            "permission_level": permission.permission_level,
+            "is_active": permission.is_active,
+            "created_at": permission.created_at
+        }
+        for permission in permissions
+    ]
 
 
 # ============================================================================
 # CLOUD STORAGE ENDPOINTS FOR PERMISSIONS
 # ============================================================================
 
-@router.get("/cloud/uploads/list", response_model=list)
+@router.get("/cloud/uploads/list")
 def list_permission_cloud_uploads():
-    """List all permission data uploaded to local cloud storage."""
-    uploads = list_all_permissions()
-    if not uploads:
-        return {"message": "No permission uploads found"}
-    return uploads
+    """List all permission data uploaded to local cloud storage.
+    
+    The JSON array is streamed while the bucket is scanned.
+    """
+    return StreamingResponse(stream_json_array(iter_permissions()), media_type="application/json")
 
 
 @router.get("/cloud/download/{permission_id}", response_model=dict)
@@ -1,23 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from app.db.database import SessionLocal, engine
-from app.models.user import Base, User
+from app.db.deps import get_db
+from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate, UserResponse
 from app.services import user_service
-
-Base.metadata.create_all(bind=engine)
+from app.utils.cache import cache
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 @router.post("/", response_model=UserResponse)
 def create_user(user: UserCreate, db: Session = Depends(get_db)):
     """Create a new user."""
@@ -37,10 +28,18 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
 @router.get("/{user_id}", response_model=UserResponse)
 def read_user(user_id: int, db: Session = Depends(get_db)):
     """Get a user by ID."""
+    cached = cache.get(f"user:{user_id}")
+    if cached is not None:
+        return cached
+    
+    generation = cache.generation()
     db_user = user_service.get_user_by_id(db, user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return db_user
+    
+    response = UserResponse.model_validate(db_user).model_dump()
+    cache.set(f"user:{user_id}", response, generation)
+    return response
 
 
 @router.get("/username/{username}", response_model=UserResponse)
@@ -64,6 +63,7 @@ def update_user(user_id: int, user_update: UserUpdate, db: Session = Depends(get
     db_user = user_service.update_user(db, user_id, user_update)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
+    cache.invalidate(f"user:{user_id}")
     return db_user
 
 
@@ -73,4 +73,5 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
     success = user_service.delete_user(db, user_id)
     if not success:
         raise HTTPException(status_code=404, detail="User not found")
+    cache.invalidate(f"user:{user_id}")
     return {"detail": "User deleted successfully"}
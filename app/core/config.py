@@ -1,8 +1,28 @@
 import os
 
-DATABASE_URL = "sqlite:///./digital_key.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./digital_key.db")
+
+# Worker threads available to sync route handlers (anyio defaults to 40)
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "100"))
+
+# Connection pool settings. Every handler thread may hold a session, so by
+# default pool size plus overflow equals THREADPOOL_SIZE and no thread waits
+# at checkout; only DB_POOL_SIZE connections stay open when idle.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", str(max(0, THREADPOOL_SIZE - DB_POOL_SIZE))))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
+
+# Set DEBUG_LAZY_LOADS=1 to make accidental relationship lazy loads raise
+RELATIONSHIP_LAZY = "raise" if os.getenv("DEBUG_LAZY_LOADS") == "1" else "select"
+
+# In-process cache for hot GET endpoints
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
 
 # Local Cloud Storage Configuration
 LOCAL_STORAGE_PATH = os.getenv("LOCAL_STORAGE_PATH", "./local_storage")
 STORAGE_BUCKET_NAME = "digital-keys"
-PERMISSIONS_BUCKET_NAME = "permissions"
\ No newline at end of file
+PERMISSIONS_BUCKET_NAME = "permissions"
+
+# Background threads writing cloud backups; each key is pinned to one of them
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "8"))
\ No newline at end of file
@@ -1,11 +1,55 @@
-from sqlalchemy import create_engine
+import logging
+from sqlalchemy import create_engine, event, make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
-from app.core.config import DATABASE_URL
+from app.core.config import (
+    DATABASE_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE,
+)
 
-print("Database URL:", DATABASE_URL)
+logger = logging.getLogger(__name__)
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+_url = make_url(DATABASE_URL)
+_is_sqlite = _url.get_backend_name() == "sqlite"
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# In-memory SQLite uses SingletonThreadPool, which rejects the QueuePool sizing arguments
+_pool_args = {}
+if not (_is_sqlite and (_url.database in (None, "", ":memory:") or _url.query.get("mode") == "memory")):
+    _pool_args = {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW}
+
+engine = create_engine(
+    DATABASE_URL,
+    pool_pre_ping=True,
+    pool_recycle=DB_POOL_RECYCLE,
+    connect_args={"check_same_thread": False} if _is_sqlite else {},
+    **_pool_args,
+)
+
+# DATABASE_URL may carry credentials, so only the masked form is ever logged
+logger.info("Database URL: %s", engine.url.render_as_string(hide_password=True))
+
+
+@event.listens_for(engine, "connect")
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    """Tune every new pooled SQLite connection once, when it is opened.
+    
+    WAL lets readers proceed while a write commits, and synchronous=NORMAL
+    drops the per-commit fsync that WAL does not need for consistency.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-64000")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+# expire_on_commit=False keeps loaded attributes usable after commit without a reload
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 Base = declarative_base()
\ No newline at end of file
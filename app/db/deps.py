@@ -0,0 +1,7 @@
+from app.db.database import SessionLocal
+
+
+def get_db():
+    """FastAPI dependency yielding a database session for one request."""
+    with SessionLocal() as db:
+        yield db
@@ -1,10 +1,38 @@
+from contextlib import asynccontextmanager
+from anyio import to_thread
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from app.core.config import THREADPOOL_SIZE
+from app.db.database import Base, engine
+from app.models import digital_key, machine, permission, user  # noqa: F401 (registers tables)
+from app.utils.cloud import initialize_storage
+from app.utils.async_uploader import shutdown_uploads
 from app.api.v1.digital_key import router as digital_key_router
 from app.api.v1.users import router as users_router
 from app.api.v1.machines import router as machines_router
 from app.api.v1.permissions import router as permissions_router
 
-app = FastAPI(title="Digital Key Backend API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Route handlers are sync and run on anyio's worker threads, so this
+    # limiter is what caps concurrent requests hitting the database.
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    
+    # Create missing tables once per process instead of once per router import
+    Base.metadata.create_all(bind=engine)
+    initialize_storage()
+    yield
+    
+    # Let queued cloud uploads finish before the process exits
+    shutdown_uploads()
+
+
+app = FastAPI(
+    title="Digital Key Backend API",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 app.include_router(digital_key_router, prefix="/api/v1")
 app.include_router(users_router, prefix="/api/v1")
@@ -1,5 +1,7 @@
 from sqlalchemy import Integer, String, Column, ForeignKey, DateTime
+from sqlalchemy.orm import relationship
 from datetime import datetime
+from app.core.config import RELATIONSHIP_LAZY
 from app.db.database import Base
 
 class DigitalKey(Base):
@@ -11,4 +13,9 @@ class DigitalKey(Base):
     owner = Column(String, index=True, nullable=False)
     machine_id = Column(Integer, ForeignKey("machines.id"), nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    machine = relationship("Machine", back_populates="digital_keys", lazy=RELATIONSHIP_LAZY)
+    permissions = relationship(
+        "UserMachinePermission", back_populates="digital_key", passive_deletes="all", lazy=RELATIONSHIP_LAZY
+    )
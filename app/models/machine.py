@@ -1,6 +1,8 @@
-from sqlalchemy import Integer, String, Column, DateTime, Enum as SQLEnum
+from sqlalchemy import Integer, String, Column, DateTime, Enum as SQLEnum, Boolean
+from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
+from app.core.config import RELATIONSHIP_LAZY
 from app.db.database import Base
 
 
@@ -21,6 +23,13 @@ class Machine(Base):
     machine_type = Column(SQLEnum(MachineType), nullable=False)
     ip_address = Column(String, nullable=True)
     description = Column(String, nullable=True)
-    is_active = Column(Integer, default=1, nullable=False)  # 1 for active, 0 for inactive
+    is_active = Column(Boolean(create_constraint=True), default=True, nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    digital_keys = relationship(
+        "DigitalKey", back_populates="machine", passive_deletes="all", lazy=RELATIONSHIP_LAZY
+    )
+    permissions = relationship(
+        "UserMachinePermission", back_populates="machine", passive_deletes="all", lazy=RELATIONSHIP_LAZY
+    )
@@ -1,6 +1,8 @@
-from sqlalchemy import Integer, String, Column, DateTime, ForeignKey, Enum as SQLEnum, Boolean
+from sqlalchemy import Integer, String, Column, DateTime, ForeignKey, Enum as SQLEnum, Boolean, Index, text
+from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
+from app.core.config import RELATIONSHIP_LAZY
 from app.db.database import Base
 
 
@@ -13,9 +15,24 @@ class PermissionLevel(str, enum.Enum):
 
 class UserMachinePermission(Base):
     __tablename__ = "user_machine_permissions"
+    __table_args__ = (
+        # The leading column also covers lookups on user_id alone
+        Index("ix_ump_user_machine", "user_id", "machine_id", unique=True),
+        # Partial indexes: only active grants are looked up by user or machine
+        Index(
+            "ix_ump_user_active", "user_id", "is_active",
+            postgresql_where=text("is_active = true"), sqlite_where=text("is_active = 1")
+        ),
+        Index(
+            "ix_ump_machine_active", "machine_id", "is_active",
+            postgresql_where=text("is_active = true"), sqlite_where=text("is_active = 1")
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Partial ix_ump_machine_active skips revoked rows, so machine-only lookups
+    # (e.g. the foreign key check when a machine is deleted) need their own index
     machine_id = Column(Integer, ForeignKey("machines.id"), nullable=False, index=True)
     digital_key_id = Column(Integer, ForeignKey("digital_keys.id"), nullable=False, index=True)
     permission_level = Column(SQLEnum(PermissionLevel), default=PermissionLevel.READ, nullable=False)
@@ -23,3 +40,7 @@ class UserMachinePermission(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     revoked_at = Column(DateTime, nullable=True)
+
+    user = relationship("User", back_populates="permissions", lazy=RELATIONSHIP_LAZY)
+    machine = relationship("Machine", back_populates="permissions", lazy=RELATIONSHIP_LAZY)
+    digital_key = relationship("DigitalKey", back_populates="permissions", lazy=RELATIONSHIP_LAZY)
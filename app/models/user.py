@@ -1,6 +1,8 @@
 from sqlalchemy import Integer, String, Column, DateTime, Enum as SQLEnum
+from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
+from app.core.config import RELATIONSHIP_LAZY
 from app.db.database import Base
 
 
@@ -20,3 +22,8 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    # passive_deletes="all" keeps deleting a user from touching its permission rows
+    permissions = relationship(
+        "UserMachinePermission", back_populates="user", passive_deletes="all", lazy=RELATIONSHIP_LAZY
+    )
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
 from enum import Enum
 
@@ -33,8 +33,7 @@ class UserMachinePermissionResponse(BaseModel):
     updated_at: datetime
     revoked_at: datetime | None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class UserAccessResponse(BaseModel):
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
 from enum import Enum
 
@@ -24,7 +24,7 @@ class MachineUpdate(BaseModel):
     machine_type: MachineType | None = None
     ip_address: str | None = None
     description: str | None = None
-    is_active: int | None = None
+    is_active: bool | None = None
 
 
 class MachineResponse(BaseModel):
@@ -33,9 +33,8 @@ class MachineResponse(BaseModel):
     machine_type: MachineType
     ip_address: str | None
     description: str | None
-    is_active: int
+    is_active: bool
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
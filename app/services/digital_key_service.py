@@ -1,13 +1,14 @@
+from sqlalchemy import Row, delete, exists, insert, lambda_stmt, select
 from sqlalchemy.orm import Session
+from datetime import datetime
 from app.models.digital_key import DigitalKey
 from app.models.machine import Machine
 from app.schemas.digital_key import DigitalKeyCreate
-from app.utils.cloud import upload_data_to_cloud, delete_data_from_cloud
+from app.utils.async_uploader import submit_delete, submit_upload
 
 def create_digital_key(db: Session, digital_key: DigitalKeyCreate) -> DigitalKey | dict:
     # Validate that the machine exists
-    machine = db.query(Machine).filter(Machine.id == digital_key.machine_id).first()
-    if not machine:
+    if not db.query(exists().where(Machine.id == digital_key.machine_id)).scalar():
         return {"error": f"Machine with ID {digital_key.machine_id} does not exist"}
     
     db_digital_key = DigitalKey(
@@ -18,10 +19,9 @@ def create_digital_key(db: Session, digital_key: DigitalKeyCreate) -> DigitalKey
     )
     db.add(db_digital_key)
     db.commit()
-    db.refresh(db_digital_key)
     
-    # Upload to local cloud storage
-    upload_data_to_cloud(
+    # Upload to local cloud storage in the background
+    submit_upload(
         data={
             "key_name": db_digital_key.key_name,
             "key_value": db_digital_key.key_value,
@@ -34,11 +34,63 @@ def create_digital_key(db: Session, digital_key: DigitalKeyCreate) -> DigitalKey
     
     return db_digital_key
 
+def create_digital_keys_bulk(db: Session, digital_keys: list[DigitalKeyCreate]) -> list[Row] | dict:
+    """Create several digital keys in one transaction and upload them in parallel.
+    
+    All machine IDs are validated with a single IN query and the keys are
+    inserted with one INSERT ... RETURNING. Nothing is created if any item
+    references a missing machine; the error names the index of that item.
+    """
+    if not digital_keys:
+        return []
+    
+    machine_ids = {row.id for row in db.query(Machine.id).filter(Machine.id.in_({k.machine_id for k in digital_keys}))}
+    for index, digital_key in enumerate(digital_keys):
+        if digital_key.machine_id not in machine_ids:
+            return {"error": f"Item {index}: Machine with ID {digital_key.machine_id} does not exist"}
+    
+    rows = db.execute(
+        insert(DigitalKey).returning(*DigitalKey.__table__.columns, sort_by_parameter_order=True),
+        [
+            {
+                "key_name": k.key_name,
+                "key_value": k.key_value,
+                "owner": k.owner,
+                "machine_id": k.machine_id
+            }
+            for k in digital_keys
+        ]
+    ).all()
+    db.commit()
+    
+    # Fan the uploads out over the background upload pool, stamped once for the batch
+    uploaded_at = datetime.utcnow()
+    for row in rows:
+        submit_upload(
+            data={
+                "key_name": row.key_name,
+                "key_value": row.key_value,
+                "owner": row.owner,
+                "machine_id": row.machine_id
+            },
+            key_id=row.id,
+            key_name=row.key_name,
+            uploaded_at=uploaded_at
+        )
+    
+    return rows
+
 def get_digital_key_by_id(db: Session, key_id: int) -> DigitalKey | None:
-    return db.query(DigitalKey).filter(DigitalKey.id == key_id).first()
+    # The lambda statement is compiled once and cached; key_id is bound per call
+    return db.execute(lambda_stmt(lambda: select(DigitalKey).where(DigitalKey.id == key_id))).scalar_one_or_none()
 
-def get_all_digital_keys(db: Session) -> list[DigitalKey]:
-    return db.query(DigitalKey).all()
+def get_all_digital_keys(db: Session, skip: int = 0, limit: int = 100, after_id: int | None = None) -> list[Row]:
+    """Get a page of digital keys as column rows, skipping ORM instance setup"""
+    query = db.query(*DigitalKey.__table__.columns).order_by(DigitalKey.id)
+    if after_id is not None:
+        # Keyset pagination: seek past the last seen id instead of scanning skipped rows
+        return query.filter(DigitalKey.id > after_id).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
 
 def update_digital_key(db: Session, key_id: int, digital_key: DigitalKeyCreate) -> DigitalKey | dict | None:
     db_digital_key = db.query(DigitalKey).filter(DigitalKey.id == key_id).first()
@@ -46,12 +98,10 @@ def update_digital_key(db: Session, key_id: int, digital_key: DigitalKeyCreate)
         return None
     
     # Validate that the machine exists
-    machine = db.query(Machine).filter(Machine.id == digital_key.machine_id).first()
-    if not machine:
+    if not db.query(exists().where(Machine.id == digital_key.machine_id)).scalar():
         return {"error": f"Machine with ID {digital_key.machine_id} does not exist"}
     
-    # Delete old cloud storage file
-    delete_data_from_cloud(db_digital_key.id, db_digital_key.key_name)
+    old_key_name = db_digital_key.key_name
     
     # Update database
     db_digital_key.key_name = digital_key.key_name
@@ -59,10 +109,11 @@ def update_digital_key(db: Session, key_id: int, digital_key: DigitalKeyCreate)
     db_digital_key.owner = digital_key.owner
     db_digital_key.machine_id = digital_key.machine_id
     db.commit()
-    db.refresh(db_digital_key)
     
-    # Upload updated data to cloud storage
-    upload_data_to_cloud(
+    # Replace the old cloud storage file in the background; both writes share
+    # the key's upload lane, so the delete runs before the new upload
+    submit_delete(db_digital_key.id, old_key_name)
+    submit_upload(
         data={
             "key_name": db_digital_key.key_name,
             "key_value": db_digital_key.key_value,
@@ -76,25 +127,26 @@ def update_digital_key(db: Session, key_id: int, digital_key: DigitalKeyCreate)
     return db_digital_key
 
 def delete_digital_key(db: Session, key_id: int) -> bool:
-    digital_key = db.query(DigitalKey).filter(DigitalKey.id == key_id).first()
-    if digital_key:
-        # Delete from cloud storage
-        delete_data_from_cloud(digital_key.id, digital_key.key_name)
-        
-        # Delete from database
-        db.delete(digital_key)
-        db.commit()
-        return True
-    return False
+    # Delete from database, returning the name needed to locate the cloud file
+    key_name = db.execute(
+        delete(DigitalKey).where(DigitalKey.id == key_id).returning(DigitalKey.key_name)
+    ).scalar_one_or_none()
+    db.commit()
+    if key_name is None:
+        return False
+    
+    # Delete from cloud storage once any queued upload of the key has run
+    submit_delete(key_id, key_name)
+    return True
 
-def get_digital_keys_by_machine(db: Session, machine_id: int) -> list[DigitalKey]:
-    """Get all digital keys associated with a specific machine"""
-    return db.query(DigitalKey).filter(DigitalKey.machine_id == machine_id).all()
+def get_digital_keys_by_machine(db: Session, machine_id: int, skip: int = 0, limit: int = 100) -> list[Row]:
+    """Get digital keys associated with a specific machine, with pagination, as column rows"""
+    return db.query(*DigitalKey.__table__.columns).filter(DigitalKey.machine_id == machine_id).order_by(DigitalKey.id).offset(skip).limit(limit).all()
 
 def get_digital_key_by_name(db: Session, key_name: str) -> DigitalKey | None:
     """Get a digital key by its name"""
     return db.query(DigitalKey).filter(DigitalKey.key_name == key_name).first()
 
-def get_digital_keys_by_owner(db: Session, owner: str) -> list[DigitalKey]:
-    """Get all digital keys owned by a specific user"""
-    return db.query(DigitalKey).filter(DigitalKey.owner == owner).all()
\ No newline at end of file
+def get_digital_keys_by_owner(db: Session, owner: str, skip: int = 0, limit: int = 100) -> list[Row]:
+    """Get digital keys owned by a specific user, with pagination, as column rows"""
+    return db.query(*DigitalKey.__table__.columns).filter(DigitalKey.owner == owner).order_by(DigitalKey.id).offset(skip).limit(limit).all()
\ No newline at end of file
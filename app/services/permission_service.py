@@ -1,27 +1,54 @@
+from sqlalchemy import Row, delete, exists, insert, lambda_stmt, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from datetime import datetime
 from app.models.permission import UserMachinePermission, PermissionLevel
 from app.models.digital_key import DigitalKey
+from app.models.machine import Machine
+from app.models.user import User
 from app.schemas.access import UserMachinePermissionCreate, UserMachinePermissionUpdate
 from app.utils.cloud import (
     upload_permission_to_cloud,
     delete_permission_from_cloud,
     update_permission_in_cloud
 )
+from app.utils.async_uploader import submit
+from app.utils.updates import update_values
 
 
 def grant_user_machine_access(db: Session, permission: UserMachinePermissionCreate) -> UserMachinePermission | dict:
     """Grant a user access to a machine with a specific digital key.
     
-    Validates that the digital key belongs to the machine being granted access to.
+    Validates that the user and machine exist, that the pair has no permission
+    yet, and that the digital key belongs to the machine, all in one query.
+    Errors carry a status_code when they should not map to HTTP 400.
     Uploads permission data to cloud storage.
     """
-    # Validate that the digital key exists and belongs to the machine
-    digital_key = db.query(DigitalKey).filter(DigitalKey.id == permission.digital_key_id).first()
-    if not digital_key:
+    checks = db.query(
+        exists().where(User.id == permission.user_id).label("user_exists"),
+        exists().where(Machine.id == permission.machine_id).label("machine_exists"),
+        exists().where(
+            UserMachinePermission.user_id == permission.user_id,
+            UserMachinePermission.machine_id == permission.machine_id
+        ).label("permission_exists"),
+        select(DigitalKey.machine_id).where(
+            DigitalKey.id == permission.digital_key_id
+        ).scalar_subquery().label("key_machine_id")
+    ).one()
+    
+    if not checks.user_exists:
+        return {"error": "User not found", "status_code": 404}
+    
+    if not checks.machine_exists:
+        return {"error": "Machine not found", "status_code": 404}
+    
+    if checks.permission_exists:
+        return {"error": "Permission already exists for this user-machine pair"}
+    
+    if checks.key_machine_id is None:
         return {"error": f"Digital key with ID {permission.digital_key_id} does not exist"}
     
-    if digital_key.machine_id != permission.machine_id:
+    if checks.key_machine_id != permission.machine_id:
         return {"error": f"Digital key {permission.digital_key_id} does not belong to machine {permission.machine_id}."}
     
     db_permission = UserMachinePermission(
@@ -32,42 +59,122 @@ def grant_user_machine_access(db: Session, permission: UserMachinePermissionCrea
         is_active=True
     )
     db.add(db_permission)
-    db.commit()
-    db.refresh(db_permission)
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent grant for the same pair won the unique ix_ump_user_machine
+        db.rollback()
+        return {"error": "Permission already exists for this user-machine pair"}
     
-    # Upload permission data to cloud storage
+    # Upload permission data to cloud storage in the background
     permission_data = {
         "user_id": db_permission.user_id,
         "machine_id": db_permission.machine_id,
         "digital_key_id": db_permission.digital_key_id,
         "permission_level": db_permission.permission_level.value,
         "is_active": db_permission.is_active,
-        "created_at": db_permission.created_at.isoformat() if db_permission.created_at else None
+        "created_at": db_permission.created_at
     }
-    upload_permission_to_cloud(permission_data, db_permission.id)
+    submit(("permission", db_permission.id), upload_permission_to_cloud, permission_data, db_permission.id)
     
     return db_permission
 
 
+def grant_user_machine_access_bulk(db: Session, permissions: list[UserMachinePermissionCreate]) -> list[Row] | dict:
+    """Grant several user-machine permissions in one transaction.
+    
+    Applies the same checks as grant_user_machine_access, but with one IN query
+    per table for the whole batch, then inserts every row in a single
+    INSERT ... RETURNING. Nothing is granted if any item fails validation;
+    the error names the index of the first failing item.
+    """
+    if not permissions:
+        return []
+    
+    pairs = [(p.user_id, p.machine_id) for p in permissions]
+    if len(set(pairs)) != len(pairs):
+        return {"error": "Batch contains duplicate user-machine pairs"}
+    
+    user_ids = {row.id for row in db.query(User.id).filter(User.id.in_({p.user_id for p in permissions}))}
+    machine_ids = {row.id for row in db.query(Machine.id).filter(Machine.id.in_({p.machine_id for p in permissions}))}
+    key_machines = dict(db.query(DigitalKey.id, DigitalKey.machine_id).filter(
+        DigitalKey.id.in_({p.digital_key_id for p in permissions})
+    ).all())
+    existing_pairs = set(db.query(UserMachinePermission.user_id, UserMachinePermission.machine_id).filter(
+        tuple_(UserMachinePermission.user_id, UserMachinePermission.machine_id).in_(pairs)
+    ).all())
+    
+    for index, permission in enumerate(permissions):
+        if permission.user_id not in user_ids:
+            return {"error": f"Item {index}: User not found", "status_code": 404}
+        if permission.machine_id not in machine_ids:
+            return {"error": f"Item {index}: Machine not found", "status_code": 404}
+        if (permission.user_id, permission.machine_id) in existing_pairs:
+            return {"error": f"Item {index}: Permission already exists for this user-machine pair"}
+        if permission.digital_key_id not in key_machines:
+            return {"error": f"Item {index}: Digital key with ID {permission.digital_key_id} does not exist"}
+        if key_machines[permission.digital_key_id] != permission.machine_id:
+            return {"error": f"Item {index}: Digital key {permission.digital_key_id} does not belong to machine {permission.machine_id}."}
+    
+    try:
+        rows = db.execute(
+            insert(UserMachinePermission).returning(
+                *UserMachinePermission.__table__.columns, sort_by_parameter_order=True
+            ),
+            [
+                {
+                    "user_id": p.user_id,
+                    "machine_id": p.machine_id,
+                    "digital_key_id": p.digital_key_id,
+                    "permission_level": p.permission_level,
+                    "is_active": True
+                }
+                for p in permissions
+            ]
+        ).all()
+        db.commit()
+    except IntegrityError:
+        # A concurrent grant took one of the pairs after the existence check
+        db.rollback()
+        return {"error": "Permission already exists for one of the user-machine pairs in the batch"}
+    
+    # Upload permission data to cloud storage in the background, stamped once for the batch
+    uploaded_at = datetime.utcnow()
+    for row in rows:
+        permission_data = {
+            "user_id": row.user_id,
+            "machine_id": row.machine_id,
+            "digital_key_id": row.digital_key_id,
+            "permission_level": row.permission_level.value,
+            "is_active": row.is_active,
+            "created_at": row.created_at
+        }
+        submit(("permission", row.id), upload_permission_to_cloud, permission_data, row.id, uploaded_at)
+    
+    return rows
+
+
 def get_permission_by_id(db: Session, permission_id: int) -> UserMachinePermission | None:
-    """Get a permission by ID."""
-    return db.query(UserMachinePermission).filter(UserMachinePermission.id == permission_id).first()
+    """Get a permission by ID. The lambda statement is compiled once and cached."""
+    return db.execute(
+        lambda_stmt(lambda: select(UserMachinePermission).where(UserMachinePermission.id == permission_id))
+    ).scalar_one_or_none()
 
 
-def get_user_permissions(db: Session, user_id: int) -> list[UserMachinePermission]:
-    """Get all permissions for a specific user."""
-    return db.query(UserMachinePermission).filter(
+def get_user_permissions(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> list[Row]:
+    """Get active permissions for a specific user, with pagination, as column rows."""
+    return db.query(*UserMachinePermission.__table__.columns).filter(
         UserMachinePermission.user_id == user_id,
         UserMachinePermission.is_active == True
-    ).all()
+    ).order_by(UserMachinePermission.id).offset(skip).limit(limit).all()
 
 
-def get_machine_permissions(db: Session, machine_id: int) -> list[UserMachinePermission]:
-    """Get all permissions for a specific machine."""
-    return db.query(UserMachinePermission).filter(
+def get_machine_permissions(db: Session, machine_id: int, skip: int = 0, limit: int = 100) -> list[Row]:
+    """Get active permissions for a specific machine, with pagination, as column rows."""
+    return db.query(*UserMachinePermission.__table__.columns).filter(
         UserMachinePermission.machine_id == machine_id,
         UserMachinePermission.is_active == True
-    ).all()
+    ).order_by(UserMachinePermission.id).offset(skip).limit(limit).all()
 
 
 def get_user_machine_permission(db: Session, user_id: int, machine_id: int) -> UserMachinePermission | None:
@@ -79,82 +186,88 @@ def get_user_machine_permission(db: Session, user_id: int, machine_id: int) -> U
     ).first()
 
 
-def get_all_permissions(db: Session, skip: int = 0, limit: int = 100) -> list[UserMachinePermission]:
-    """Get all permissions with pagination."""
-    return db.query(UserMachinePermission).offset(skip).limit(limit).all()
+def get_all_permissions(db: Session, skip: int = 0, limit: int = 100) -> list[Row]:
+    """Get all permissions with pagination, as column rows rather than ORM instances."""
+    return db.query(*UserMachinePermission.__table__.columns).order_by(UserMachinePermission.id).offset(skip).limit(limit).all()
 
 
 def update_permission(db: Session, permission_id: int, permission_update: UserMachinePermissionUpdate) -> UserMachinePermission | None:
     """Update a permission and upload to cloud storage."""
-    db_permission = db.query(UserMachinePermission).filter(UserMachinePermission.id == permission_id).first()
-    if db_permission:
-        if permission_update.permission_level is not None:
-            db_permission.permission_level = permission_update.permission_level
-        if permission_update.is_active is not None:
-            db_permission.is_active = permission_update.is_active
+    updates = update_values(permission_update, UserMachinePermission)
+    if updates:
+        db_permission = db.execute(
+            update(UserMachinePermission)
+            .where(UserMachinePermission.id == permission_id)
+            .values(**updates)
+            .returning(UserMachinePermission)
+        ).scalar_one_or_none()
         db.commit()
-        db.refresh(db_permission)
-        
-        # Upload updated permission data to cloud storage
+    else:
+        db_permission = get_permission_by_id(db, permission_id)
+    
+    if db_permission:
+        # Upload updated permission data to cloud storage in the background
         permission_data = {
             "user_id": db_permission.user_id,
             "machine_id": db_permission.machine_id,
             "digital_key_id": db_permission.digital_key_id,
             "permission_level": db_permission.permission_level.value,
             "is_active": db_permission.is_active,
-            "updated_at": datetime.utcnow().isoformat()
+            "updated_at": db_permission.updated_at
         }
-        update_permission_in_cloud(permission_data, db_permission.id)
+        submit(("permission", db_permission.id), update_permission_in_cloud, permission_data, db_permission.id)
     
     return db_permission
 
 
 def revoke_permission(db: Session, permission_id: int) -> bool:
     """Revoke a user's access to a machine and delete from cloud storage."""
-    db_permission = db.query(UserMachinePermission).filter(UserMachinePermission.id == permission_id).first()
-    if db_permission:
-        db_permission.is_active = False
-        db_permission.revoked_at = datetime.utcnow()
-        db.commit()
-        
-        # Update in cloud storage
-        permission_data = {
-            "user_id": db_permission.user_id,
-            "machine_id": db_permission.machine_id,
-            "digital_key_id": db_permission.digital_key_id,
-            "permission_level": db_permission.permission_level.value,
-            "is_active": db_permission.is_active,
-            "revoked_at": db_permission.revoked_at.isoformat() if db_permission.revoked_at else None
-        }
-        update_permission_in_cloud(permission_data, db_permission.id)
-        
-        return True
-    return False
+    db_permission = db.execute(
+        update(UserMachinePermission)
+        .where(UserMachinePermission.id == permission_id)
+        .values(is_active=False, revoked_at=datetime.utcnow())
+        .returning(UserMachinePermission)
+    ).scalar_one_or_none()
+    db.commit()
+    if db_permission is None:
+        return False
+    
+    # Update in cloud storage in the background
+    permission_data = {
+        "user_id": db_permission.user_id,
+        "machine_id": db_permission.machine_id,
+        "digital_key_id": db_permission.digital_key_id,
+        "permission_level": db_permission.permission_level.value,
+        "is_active": db_permission.is_active,
+        "revoked_at": db_permission.revoked_at
+    }
+    submit(("permission", db_permission.id), update_permission_in_cloud, permission_data, db_permission.id)
+    
+    return True
 
 
 def revoke_user_machine_access(db: Session, user_id: int, machine_id: int) -> bool:
     """Revoke a user's access to a specific machine."""
-    db_permission = db.query(UserMachinePermission).filter(
-        UserMachinePermission.user_id == user_id,
-        UserMachinePermission.machine_id == machine_id
-    ).first()
-    if db_permission:
-        db_permission.is_active = False
-        db_permission.revoked_at = datetime.utcnow()
-        db.commit()
-        return True
-    return False
+    result = db.execute(
+        update(UserMachinePermission)
+        .where(
+            UserMachinePermission.user_id == user_id,
+            UserMachinePermission.machine_id == machine_id
+        )
+        .values(is_active=False, revoked_at=datetime.utcnow())
+    )
+    db.commit()
+    return result.rowcount > 0
 
 
 def delete_permission(db: Session, permission_id: int) -> bool:
     """Delete a permission record and from cloud storage."""
-    db_permission = db.query(UserMachinePermission).filter(UserMachinePermission.id == permission_id).first()
-    if db_permission:
-        db.delete(db_permission)
-        db.commit()
-        
-        # Delete from cloud storage
-        delete_permission_from_cloud(permission_id)
-        
-        return True
-    return False
+    result = db.execute(delete(UserMachinePermission).where(UserMachinePermission.id == permission_id))
+    db.commit()
+    if result.rowcount == 0:
+        return False
+    
+    # Delete from cloud storage once any queued write of the permission has run
+    submit(("permission", permission_id), delete_permission_from_cloud, permission_id)
+    
+    return True
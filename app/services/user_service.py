@@ -1,6 +1,8 @@
+from sqlalchemy import Row, delete, lambda_stmt, select, update
 from sqlalchemy.orm import Session
 from app.models.user import User, UserType
 from app.schemas.user import UserCreate, UserUpdate
+from app.utils.updates import update_values
 
 
 def create_user(db: Session, user: UserCreate) -> User:
@@ -12,13 +14,12 @@ def create_user(db: Session, user: UserCreate) -> User:
     )
     db.add(db_user)
     db.commit()
-    db.refresh(db_user)
     return db_user
 
 
 def get_user_by_id(db: Session, user_id: int) -> User | None:
-    """Get user by ID."""
-    return db.query(User).filter(User.id == user_id).first()
+    """Get user by ID. The lambda statement is compiled once and cached."""
+    return db.execute(lambda_stmt(lambda: select(User).where(User.id == user_id))).scalar_one_or_none()
 
 
 def get_user_by_username(db: Session, username: str) -> User | None:
@@ -26,36 +27,30 @@ def get_user_by_username(db: Session, username: str) -> User | None:
     return db.query(User).filter(User.username == username).first()
 
 
-def get_all_users(db: Session, skip: int = 0, limit: int = 100) -> list[User]:
-    """Get all users with pagination."""
-    return db.query(User).offset(skip).limit(limit).all()
+def get_all_users(db: Session, skip: int = 0, limit: int = 100) -> list[Row]:
+    """Get all users with pagination, as column rows rather than ORM instances."""
+    return db.query(*User.__table__.columns).order_by(User.id).offset(skip).limit(limit).all()
 
 
-def get_users_by_type(db: Session, user_type: UserType) -> list[User]:
-    """Get all users of a specific type."""
-    return db.query(User).filter(User.user_type == user_type).all()
+def get_users_by_type(db: Session, user_type: UserType) -> list[Row]:
+    """Get all users of a specific type, as column rows."""
+    return db.query(*User.__table__.columns).filter(User.user_type == user_type).all()
 
 
 def update_user(db: Session, user_id: int, user_update: UserUpdate) -> User | None:
-    """Update a user."""
-    db_user = db.query(User).filter(User.id == user_id).first()
-    if db_user:
-        if user_update.username is not None:
-            db_user.username = user_update.username
-        if user_update.user_type is not None:
-            db_user.user_type = user_update.user_type
-        if user_update.email is not None:
-            db_user.email = user_update.email
-        db.commit()
-        db.refresh(db_user)
+    """Update a user with a single UPDATE ... RETURNING statement."""
+    updates = update_values(user_update, User)
+    if not updates:
+        return get_user_by_id(db, user_id)
+    db_user = db.execute(
+        update(User).where(User.id == user_id).values(**updates).returning(User)
+    ).scalar_one_or_none()
+    db.commit()
     return db_user
 
 
 def delete_user(db: Session, user_id: int) -> bool:
     """Delete a user."""
-    db_user = db.query(User).filter(User.id == user_id).first()
-    if db_user:
-        db.delete(db_user)
-        db.commit()
-        return True
-    return False
+    result = db.execute(delete(User).where(User.id == user_id))
+    db.commit()
+    return result.rowcount > 0
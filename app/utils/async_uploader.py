@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Optional
+from app.core.config import UPLOAD_WORKERS
+from app.utils.cloud import delete_data_from_cloud, upload_data_to_cloud
+
+logger = logging.getLogger(__name__)
+
+_MAX_ATTEMPTS = 3
+
+# One single-thread executor per lane: writes for the same key always land on
+# the same lane, so they run one at a time and in the order they were queued.
+_lanes: Optional[list[ThreadPoolExecutor]] = None
+_lanes_lock = threading.Lock()
+
+
+def _get_lanes() -> list[ThreadPoolExecutor]:
+    """
+    Return the upload lanes, starting them on first use or after a shutdown.
+    """
+    global _lanes
+    lanes = _lanes
+    if lanes is None:
+        with _lanes_lock:
+            if _lanes is None:
+                _lanes = [
+                    ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"cloud-upload-{i}")
+                    for i in range(max(1, UPLOAD_WORKERS))
+                ]
+            lanes = _lanes
+    return lanes
+
+
+def _run_with_retry(key: Hashable, fn: Callable[..., bool], *args: Any) -> bool:
+    """
+    Run a cloud write, retrying with exponential backoff (1s, 2s) on failure.
+    Cloud writes are idempotent, so re-running one after a partial failure is safe.
+    """
+    for attempt in range(_MAX_ATTEMPTS):
+        try:
+            if fn(*args):
+                return True
+        except Exception as e:
+            logger.warning("Attempt %d of %s for %r raised: %s", attempt + 1, fn.__name__, key, e)
+        if attempt < _MAX_ATTEMPTS - 1:
+            time.sleep(2 ** attempt)
+    
+    logger.error("Giving up on %s for %r after %d attempts", fn.__name__, key, _MAX_ATTEMPTS)
+    return False
+
+
+def submit(key: Hashable, fn: Callable[..., bool], *args: Any) -> Future:
+    """
+    Queue a cloud storage write without waiting for it.
+    
+    Writes sharing a key run in submission order on a single lane, so a delete
+    queued after an upload of the same object can never run before it.
+    
+    Args:
+        key (Hashable): Identifies the stored object, e.g. ("permission", 7);
+            also used to name the object in failure logs.
+        fn (Callable[..., bool]): An idempotent cloud function returning True
+            on success, called as fn(*args).
+        *args (Any): Arguments for fn.
+    
+    Returns:
+        Future: Resolves to True if the write eventually succeeded.
+    """
+    lanes = _get_lanes()
+    return lanes[hash(key) % len(lanes)].submit(_run_with_retry, key, fn, *args)
+
+
+def submit_upload(
+    data: Dict[str, Any], key_id: int, key_name: str, uploaded_at: Optional[datetime] = None
+) -> Future:
+    """
+    Queue a digital key upload to local cloud storage without waiting for it.
+    
+    Args:
+        data (Dict[str, Any]): The data to upload (digital key information).
+        key_id (int): The unique identifier for the digital key.
+        key_name (str): The name of the digital key.
+        uploaded_at (Optional[datetime]): Upload timestamp; defaults to when the
+            upload runs.
+    
+    Returns:
+        Future: Resolves to True if the upload eventually succeeded.
+    """
+    return submit(("digital_key", key_id), upload_data_to_cloud, data, key_id, key_name, False, uploaded_at)
+
+
+def submit_delete(key_id: int, key_name: str) -> Future:
+    """
+    Queue removal of a digital key backup, ordered after any pending upload of the key.
+    
+    Args:
+        key_id (int): The unique identifier for the digital key.
+        key_name (str): The name the backup was stored under.
+    
+    Returns:
+        Future: Resolves to True once no backup is stored under key_name.
+    """
+    return submit(("digital_key", key_id), delete_data_from_cloud, key_id, key_name)
+
+
+def shutdown_uploads(wait: bool = True) -> None:
+    """
+    Stop the upload lanes and, by default, wait for queued writes to finish.
+    
+    The next submit starts fresh lanes, so the app can be started again in
+    the same process.
+    """
+    global _lanes
+    with _lanes_lock:
+        lanes, _lanes = _lanes, None
+    for lane in lanes or ():
+        lane.shutdown(wait=wait)
@@ -0,0 +1,111 @@
+import threading
+import time
+from typing import Any, Optional
+from app.core.config import CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache whose entries expire after a fixed TTL.
+    Used to serve hot GET endpoints without touching the database.
+    
+    Every invalidation is stamped with a generation number. Read-through
+    callers take generation() before reading the database and pass it to
+    set(), which drops the value if the key was invalidated in the meantime,
+    so a read racing a write cannot put the old row back.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: dict[str, tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._invalidated: dict[str, int] = {}
+        self._invalidated_prefixes: dict[str, int] = {}
+        # Sets that started before this generation are refused outright; raised
+        # when the invalidation stamps are pruned
+        self._floor = 0
+
+    def generation(self) -> int:
+        """
+        Return the current generation, to pass to set() after the database read.
+        """
+        with self._lock:
+            return self._generation
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Return the cached value for key, or None if missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key: str, value: Any, generation: Optional[int] = None) -> None:
+        """
+        Store value under key for ttl_seconds.
+        
+        When generation is given, the value is discarded if the key was
+        invalidated after that generation was taken.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if generation is not None and self._is_stale(key, generation):
+                return
+            if len(self._entries) >= self.max_entries:
+                # Drop expired entries first; if still full, start over
+                self._entries = {k: e for k, e in self._entries.items() if e[0] > now}
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+            self._entries[key] = (now + self.ttl_seconds, value)
+
+    def invalidate(self, *keys: str) -> None:
+        """
+        Remove the given keys from the cache.
+        """
+        with self._lock:
+            generation = self._next_generation()
+            for key in keys:
+                self._entries.pop(key, None)
+                self._invalidated[key] = generation
+
+    def invalidate_prefix(self, prefix: str) -> None:
+        """
+        Remove every key starting with prefix (e.g. all cached list pages).
+        """
+        with self._lock:
+            self._invalidated_prefixes[prefix] = self._next_generation()
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def _next_generation(self) -> int:
+        """
+        Advance and return the generation. Must be called with _lock held.
+        """
+        self._generation += 1
+        if len(self._invalidated) >= self.max_entries:
+            # Forget per-key stamps; any set that began before now is refused instead
+            self._invalidated.clear()
+            self._floor = self._generation
+        return self._generation
+
+    def _is_stale(self, key: str, generation: int) -> bool:
+        """
+        Whether key was invalidated after generation. Must be called with _lock held.
+        """
+        if generation < self._floor or self._invalidated.get(key, 0) > generation:
+            return True
+        return any(
+            stamp > generation and key.startswith(prefix)
+            for prefix, stamp in self._invalidated_prefixes.items()
+        )
+
+
+cache = TTLCache(ttl_seconds=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES)
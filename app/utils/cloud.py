@@ -1,29 +1,130 @@
+import atexit
 import os
-import json
+import logging
+import mmap
+import orjson
+import queue
 import shutil
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, Optional
+from functools import lru_cache
+from typing import BinaryIO, Dict, Any, Iterable, Iterator, Optional
 from pathlib import Path
 from app.core.config import LOCAL_STORAGE_PATH, STORAGE_BUCKET_NAME, PERMISSIONS_BUCKET_NAME
 
+logger = logging.getLogger(__name__)
 
-def initialize_storage() -> None:
+_BUCKET = Path(LOCAL_STORAGE_PATH) / STORAGE_BUCKET_NAME
+_BUCKET_METADATA = _BUCKET / ".metadata"
+_PERM_DIR = Path(LOCAL_STORAGE_PATH) / PERMISSIONS_BUCKET_NAME
+_PERM_DIR_STR = str(_PERM_DIR)
+
+# Path separators and spaces in key names become underscores, so a name can
+# never point outside the bucket
+_NAME_TRANS = str.maketrans({' ': '_', '/': '_', '\\': '_', ':': '_'})
+
+_STORAGE_READY = False
+_INIT_LOCK = threading.Lock()
+
+# Thread pool shared by every listing that reads files, and how many reads
+# one listing may have in flight
+_READ_EXECUTOR = ThreadPoolExecutor(max_workers=16, thread_name_prefix="cloud-read")
+_READ_AHEAD = 32
+
+# Shared connection to the digital key metadata index (.metadata/index.db)
+_INDEX_DB: Optional[sqlite3.Connection] = None
+_INDEX_LOCK = threading.Lock()
+
+# Concatenated NDJSON copy of every permission write, used for listings;
+# compacted like the index journal once dead lines outnumber live records
+_PERM_SHARD = _PERM_DIR / "permissions.shard"
+_PERM_SHARD_IDS: Optional[set[int]] = None
+_PERM_SHARD_LINES = 0
+_PERM_SHARD_LOCK = threading.Lock()
+
+# Parsed permission files keyed by ID, as (st_mtime_ns, data), least recently used first
+_DOWNLOAD_CACHE: "OrderedDict[int, tuple[int, Dict[str, Any]]]" = OrderedDict()
+_DOWNLOAD_CACHE_MAX = 1024
+_DOWNLOAD_CACHE_LOCK = threading.Lock()
+
+# Permission metadata index: a dict keyed by permission ID, persisted as an
+# append-only NDJSON journal (.metadata/permissions_index.ndjson)
+_PERM_METADATA = _PERM_DIR / ".metadata"
+_PERM_JOURNAL = _PERM_METADATA / "permissions_index.ndjson"
+_PERM_COMPACT_MIN_LINES = 1000
+_PERM_INDEX: Optional[Dict[int, Dict[str, Any]]] = None
+_PERM_JOURNAL_FP: Optional[BinaryIO] = None
+_PERM_JOURNAL_LINES = 0
+_PERM_INDEX_LOCK = threading.Lock()
+
+
+def _file_name(key_id: int, key_name: str) -> str:
     """
-    Initialize local cloud storage directories.
-    Creates the necessary folder structure for local storage.
+    Build the storage file name for a digital key.
     """
+    return f"{key_id}_{key_name.translate(_NAME_TRANS)}.json"
+
+
+def _atomic_write(path: str, payload: bytes) -> None:
+    """
+    Replace path with payload atomically: write a temp file in the same
+    directory with a single write() call, then rename it over path. Readers
+    see either the old or the new contents, never a torn file.
+    """
+    directory, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=name, suffix=".tmp")
     try:
-        storage_path = Path(LOCAL_STORAGE_PATH) / STORAGE_BUCKET_NAME
-        storage_path.mkdir(parents=True, exist_ok=True)
-        metadata_path = storage_path / ".metadata"
-        metadata_path.mkdir(exist_ok=True)
-        print(f"Local storage initialized at: {storage_path}")
-    except Exception as e:
-        print(f"Failed to initialize storage: {e}")
+        os.write(fd, payload)
+    finally:
+        os.close(fd)
+    try:
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
         raise
 
 
-def upload_data_to_cloud(data: Dict[str, Any], key_id: int, key_name: str) -> bool:
+@lru_cache(maxsize=1)
+def _get_permission_dir() -> str:
+    """
+    Return the permissions bucket directory as a plain string, creating it on
+    the first call only.
+    """
+    _PERM_DIR.mkdir(parents=True, exist_ok=True)
+    return _PERM_DIR_STR
+
+
+def initialize_storage() -> None:
+    """
+    Initialize local cloud storage directories.
+    Creates the necessary folder structure for local storage once per process;
+    later calls return without touching the filesystem.
+    """
+    global _STORAGE_READY
+    if _STORAGE_READY:
+        return
+    
+    with _INIT_LOCK:
+        if _STORAGE_READY:
+            return
+        try:
+            _BUCKET.mkdir(parents=True, exist_ok=True)
+            _BUCKET_METADATA.mkdir(exist_ok=True)
+            _STORAGE_READY = True
+            logger.info("Local storage initialized at: %s", _BUCKET)
+        except Exception as e:
+            logger.error("Failed to initialize storage: %s", e)
+            raise
+
+
+def upload_data_to_cloud(
+    data: Dict[str, Any], key_id: int, key_name: str, durable: bool = False,
+    uploaded_at: Optional[datetime] = None
+) -> bool:
     """
     Upload digital key data to local cloud storage as JSON.
     
@@ -31,33 +132,39 @@ def upload_data_to_cloud(data: Dict[str, Any], key_id: int, key_name: str) -> bo
         data (Dict[str, Any]): The data to upload (digital key information).
         key_id (int): The unique identifier for the digital key.
         key_name (str): The name of the digital key.
+        durable (bool): fsync the file before returning. Defaults to False.
+        uploaded_at (Optional[datetime]): Upload timestamp; bulk callers pass one
+            shared value. Defaults to the current UTC time.
         
     Returns:
         bool: True if upload is successful, False otherwise.
     """
     try:
-        initialize_storage()
-        
-        storage_path = Path(LOCAL_STORAGE_PATH) / STORAGE_BUCKET_NAME
-        
         # Create a unique file path using key_id and key_name
-        file_name = f"{key_id}_{key_name.replace(' ', '_')}.json"
-        file_path = storage_path / file_name
+        file_path = _BUCKET / _file_name(key_id, key_name)
         
         # Add metadata
         upload_data = {
             "id": key_id,
             "key_name": data.get("key_name"),
             "owner": data.get("owner"),
-            "uploaded_at": datetime.utcnow().isoformat(),
+            "uploaded_at": uploaded_at or datetime.utcnow(),
             "original_data": data
         }
         
-        # Write to local storage
-        with open(file_path, 'w') as f:
-            json.dump(upload_data, f, indent=2)
+        # Write to local storage, creating the bucket only if it is missing
+        try:
+            f = open(file_path, 'wb')
+        except FileNotFoundError:
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            f = open(file_path, 'wb')
+        with f:
+            f.write(orjson.dumps(upload_data))
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
         
-        print(f"✓ Data uploaded successfully to: {file_path}")
+        logger.debug("Data uploaded to %s", file_path)
         
         # Update metadata index
         _update_metadata_index(key_id, key_name, str(file_path))
@@ -65,7 +172,7 @@ def upload_data_to_cloud(data: Dict[str, Any], key_id: int, key_name: str) -> bo
         return True
         
     except Exception as e:
-        print(f"✗ Upload failed: {e}")
+        logger.error("Upload failed: %s", e)
         return False
 
 
@@ -81,22 +188,20 @@ def download_data_from_cloud(key_id: int, key_name: str) -> Optional[Dict[str, A
         Optional[Dict[str, Any]]: The downloaded data or None if not found.
     """
     try:
-        storage_path = Path(LOCAL_STORAGE_PATH) / STORAGE_BUCKET_NAME
-        file_name = f"{key_id}_{key_name.replace(' ', '_')}.json"
-        file_path = storage_path / file_name
+        file_path = _BUCKET / _file_name(key_id, key_name)
         
-        if not file_path.exists():
-            print(f"✗ File not found: {file_path}")
+        try:
+            with open(file_path, 'rb') as f:
+                data = orjson.loads(f.read())
+        except FileNotFoundError:
+            logger.debug("File not found: %s", file_path)
             return None
         
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-        
-        print(f"✓ Data downloaded successfully from: {file_path}")
+        logger.debug("Data downloaded from %s", file_path)
         return data
         
     except Exception as e:
-        print(f"✗ Download failed: {e}")
+        logger.error("Download failed: %s", e)
         return None
 
 
@@ -104,58 +209,137 @@ def delete_data_from_cloud(key_id: int, key_name: str) -> bool:
     """
     Delete digital key data from local cloud storage.
     
+    Idempotent, so a retried delete is harmless: a file that is already gone
+    counts as deleted, and the index entry is removed either way.
+    
     Args:
         key_id (int): The unique identifier for the digital key.
         key_name (str): The name of the digital key.
         
     Returns:
-        bool: True if deletion is successful, False otherwise.
+        bool: True if the data is no longer stored, False on error.
     """
     try:
-        storage_path = Path(LOCAL_STORAGE_PATH) / STORAGE_BUCKET_NAME
-        file_name = f"{key_id}_{key_name.replace(' ', '_')}.json"
-        file_path = storage_path / file_name
+        file_path = _BUCKET / _file_name(key_id, key_name)
         
-        if not file_path.exists():
-            print(f"✗ File not found: {file_path}")
-            return False
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            logger.debug("File not found: %s", file_path)
         
-        os.remove(file_path)
         _remove_from_metadata_index(key_id, key_name)
         
-        print(f"✓ Data deleted successfully: {file_path}")
+        logger.debug("Data deleted: %s", file_path)
         return True
         
     except Exception as e:
-        print(f"✗ Deletion failed: {e}")
+        logger.error("Deletion failed: %s", e)
         return False
 
 
-def list_all_uploads() -> list[Dict[str, Any]]:
+def _read_upload(file_path: str) -> Optional[Dict[str, Any]]:
     """
-    List all uploaded digital key data from local storage.
+    Read one uploaded file, returning None if it has disappeared since it was
+    indexed or listed.
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def _read_files(file_paths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Read and parse JSON files on the shared read pool, yielding them in order.
+    
+    At most _READ_AHEAD reads are in flight, so a slow consumer holds back the
+    reads instead of letting parsed files pile up in memory.
+    """
+    pending: "deque[Future]" = deque()
+    try:
+        for file_path in file_paths:
+            pending.append(_READ_EXECUTOR.submit(_read_upload, file_path))
+            if len(pending) >= _READ_AHEAD:
+                data = pending.popleft().result()
+                if data is not None:
+                    yield data
+        while pending:
+            data = pending.popleft().result()
+            if data is not None:
+                yield data
+    finally:
+        # The consumer stopped early: drop the reads it will never see
+        for future in pending:
+            future.cancel()
+
+
+def iter_uploads() -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yield uploaded digital key data from local storage, ordered by key ID.
+    
+    File paths come from the metadata index rather than a directory scan, and
+    the files are read on the shared read pool so their I/O overlaps.
     
     Returns:
-        list[Dict[str, Any]]: List of all uploaded files metadata.
+        Iterator[Dict[str, Any]]: Uploaded files metadata.
     """
     try:
-        storage_path = Path(LOCAL_STORAGE_PATH) / STORAGE_BUCKET_NAME
-        
-        if not storage_path.exists():
-            return []
-        
-        files = []
-        for file_path in storage_path.glob("*.json"):
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-                files.append(data)
+        with _INDEX_LOCK:
+            file_paths = [row[0] for row in _index_connection().execute("SELECT file_path FROM files ORDER BY id")]
         
-        print(f"✓ Found {len(files)} uploaded files")
-        return files
+        if not file_paths:
+            return
         
+        yield from _read_files(file_paths)
     except Exception as e:
-        print(f"✗ Failed to list uploads: {e}")
-        return []
+        logger.error("Failed to list uploads: %s", e)
+
+
+def list_all_uploads() -> list[Dict[str, Any]]:
+    """
+    List all uploaded digital key data from local storage.
+    
+    Returns:
+        list[Dict[str, Any]]: List of all uploaded files metadata.
+    """
+    files = list(iter_uploads())
+    logger.debug("Found %d uploaded files", len(files))
+    return files
+
+
+def _index_connection() -> sqlite3.Connection:
+    """
+    Return the shared metadata index connection, opening it on first use.
+    Must be called with _INDEX_LOCK held.
+    
+    A legacy index.json found next to a newly created index.db is imported once.
+    """
+    global _INDEX_DB
+    if _INDEX_DB is None:
+        _BUCKET_METADATA.mkdir(parents=True, exist_ok=True)
+        index_db = _BUCKET_METADATA / "index.db"
+        is_new = not index_db.exists()
+        
+        conn = sqlite3.connect(index_db, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS files "
+            "(id INTEGER PRIMARY KEY, key_name TEXT, file_path TEXT, indexed_at TEXT)"
+        )
+        
+        legacy_index = _BUCKET_METADATA / "index.json"
+        if is_new and legacy_index.exists():
+            with open(legacy_index, 'rb') as f:
+                entries = orjson.loads(f.read()).get("files", [])
+            conn.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                [(e["id"], e["key_name"], e["file_path"], e["indexed_at"]) for e in entries]
+            )
+        
+        _INDEX_DB = conn
+    return _INDEX_DB
 
 
 def _update_metadata_index(key_id: int, key_name: str, file_path: str) -> None:
@@ -163,29 +347,14 @@ def _update_metadata_index(key_id: int, key_name: str, file_path: str) -> None:
     Update metadata index for tracking uploaded files.
     """
     try:
-        storage_path = Path(LOCAL_STORAGE_PATH) / STORAGE_BUCKET_NAME / ".metadata"
-        index_file = storage_path / "index.json"
-        
-        # Load existing index
-        if index_file.exists():
-            with open(index_file, 'r') as f:
-                index = json.load(f)
-        else:
-            index = {"files": []}
-        
-        # Add entry if not exists
-        entry = {"id": key_id, "key_name": key_name, "file_path": file_path, "indexed_at": datetime.utcnow().isoformat()}
-        
-        # Remove old entry if exists
-        index["files"] = [f for f in index["files"] if f["id"] != key_id]
-        index["files"].append(entry)
-        
-        # Write updated index
-        with open(index_file, 'w') as f:
-            json.dump(index, f, indent=2)
+        with _INDEX_LOCK:
+            _index_connection().execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                (key_id, key_name, file_path, datetime.utcnow().isoformat())
+            )
             
     except Exception as e:
-        print(f"Failed to update metadata index: {e}")
+        logger.error("Failed to update metadata index: %s", e)
 
 
 def _remove_from_metadata_index(key_id: int, key_name: str) -> None:
@@ -193,79 +362,95 @@ def _remove_from_metadata_index(key_id: int, key_name: str) -> None:
     Remove entry from metadata index.
     """
     try:
-        storage_path = Path(LOCAL_STORAGE_PATH) / STORAGE_BUCKET_NAME / ".metadata"
-        index_file = storage_path / "index.json"
-        
-        if not index_file.exists():
-            return
-        
-        with open(index_file, 'r') as f:
-            index = json.load(f)
-        
-        # Remove entry
-        index["files"] = [f for f in index["files"] if f["id"] != key_id]
-        
-        # Write updated index
-        with open(index_file, 'w') as f:
-            json.dump(index, f, indent=2)
+        with _INDEX_LOCK:
+            _index_connection().execute("DELETE FROM files WHERE id = ?", (key_id,))
             
     except Exception as e:
-        print(f"Failed to remove from metadata index: {e}")
+        logger.error("Failed to remove from metadata index: %s", e)
 
 
 # ============================================================================
 # PERMISSION DATA STORAGE FUNCTIONS
 # ============================================================================
 
-def upload_permission_to_cloud(permission_data: Dict[str, Any], permission_id: int) -> bool:
+def upload_permission_to_cloud(
+    permission_data: Dict[str, Any], permission_id: int, uploaded_at: Optional[datetime] = None
+) -> bool:
     """
     Upload permission data to local cloud storage as JSON.
     
     Args:
         permission_data (Dict[str, Any]): The permission data to upload.
         permission_id (int): The unique identifier for the permission.
+        uploaded_at (Optional[datetime]): Upload timestamp; bulk callers pass one
+            shared value. Defaults to the current UTC time.
         
     Returns:
         bool: True if upload is successful, False otherwise.
     """
     try:
-        initialize_storage()
-        
-        storage_path = Path(LOCAL_STORAGE_PATH) / PERMISSIONS_BUCKET_NAME
-        storage_path.mkdir(parents=True, exist_ok=True)
-        
         # Create a unique file path using permission_id
-        file_name = f"perm_{permission_id}.json"
-        file_path = storage_path / file_name
+        file_path = f"{_get_permission_dir()}/perm_{permission_id}.json"
         
         # Add metadata
         upload_data = {
             "id": permission_id,
-            "user_id": permission_data.get("user_id"),
-            "machine_id": permission_data.get("machine_id"),
-            "digital_key_id": permission_data.get("digital_key_id"),
-            "permission_level": permission_data.get("permission_level"),
-            "is_active": permission_data.get("is_active"),
-            "uploaded_at": datetime.utcnow().isoformat(),
-            "original_data": permission_data
+            "uploaded_at": uploaded_at or datetime.utcnow(),
+            "data": permission_data
         }
         
         # Write to local storage
-        with open(file_path, 'w') as f:
-            json.dump(upload_data, f, indent=2)
+        record = orjson.dumps(upload_data)
+        _atomic_write(file_path, record)
+        _shard_append(permission_id, record)
         
-        print(f"✓ Permission data uploaded successfully to: {file_path}")
+        logger.debug("Permission data uploaded to %s", file_path)
         
         # Update metadata index
-        _update_permission_metadata_index(permission_id, str(file_path))
+        _update_permission_metadata_index(permission_id, file_path)
         
         return True
         
     except Exception as e:
-        print(f"✗ Permission upload failed: {e}")
+        logger.error("Permission upload failed: %s", e)
         return False
 
 
+def _expand_permission_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return a stored permission record in the flat shape readers expect.
+    
+    Records are stored as {"id", "uploaded_at" or "updated_at", "data"}; the
+    permission fields are lifted out of "data" and the payload itself is kept
+    as "original_data". Records written in the older flat shape pass through.
+    """
+    data = record.get("data")
+    if data is None:
+        return record
+    
+    expanded = {
+        "id": record["id"],
+        "user_id": data.get("user_id"),
+        "machine_id": data.get("machine_id"),
+        "digital_key_id": data.get("digital_key_id"),
+        "permission_level": data.get("permission_level"),
+        "is_active": data.get("is_active"),
+    }
+    for stamp in ("uploaded_at", "updated_at"):
+        if stamp in record:
+            expanded[stamp] = record[stamp]
+    expanded["original_data"] = data
+    return expanded
+
+
+def _invalidate_download(permission_id: int) -> None:
+    """
+    Drop a permission from the download cache after its file changes.
+    """
+    with _DOWNLOAD_CACHE_LOCK:
+        _DOWNLOAD_CACHE.pop(permission_id, None)
+
+
 def download_permission_from_cloud(permission_id: int) -> Optional[Dict[str, Any]]:
     """
     Download permission data from local cloud storage.
@@ -277,22 +462,40 @@ def download_permission_from_cloud(permission_id: int) -> Optional[Dict[str, Any
         Optional[Dict[str, Any]]: The downloaded data or None if not found.
     """
     try:
-        storage_path = Path(LOCAL_STORAGE_PATH) / PERMISSIONS_BUCKET_NAME
-        file_name = f"perm_{permission_id}.json"
-        file_path = storage_path / file_name
+        file_path = f"{_get_permission_dir()}/perm_{permission_id}.json"
         
-        if not file_path.exists():
-            print(f"✗ Permission file not found: {file_path}")
+        # Stat doubles as the existence check; the file is only opened on a cache miss
+        try:
+            mtime_ns = os.stat(file_path).st_mtime_ns
+        except FileNotFoundError:
+            logger.debug("Permission file not found: %s", file_path)
             return None
         
-        with open(file_path, 'r') as f:
-            data = json.load(f)
+        # Serve unchanged files from the parsed-content cache
+        with _DOWNLOAD_CACHE_LOCK:
+            hit = _DOWNLOAD_CACHE.get(permission_id)
+            if hit is not None and hit[0] == mtime_ns:
+                _DOWNLOAD_CACHE.move_to_end(permission_id)
+                return hit[1]
+        
+        try:
+            with open(file_path, 'rb') as f:
+                data = _expand_permission_record(orjson.loads(f.read()))
+        except FileNotFoundError:
+            logger.debug("Permission file not found: %s", file_path)
+            return None
         
-        print(f"✓ Permission data downloaded successfully from: {file_path}")
+        with _DOWNLOAD_CACHE_LOCK:
+            _DOWNLOAD_CACHE[permission_id] = (mtime_ns, data)
+            _DOWNLOAD_CACHE.move_to_end(permission_id)
+            if len(_DOWNLOAD_CACHE) > _DOWNLOAD_CACHE_MAX:
+                _DOWNLOAD_CACHE.popitem(last=False)
+        
+        logger.debug("Permission data downloaded from %s", file_path)
         return data
         
     except Exception as e:
-        print(f"✗ Permission download failed: {e}")
+        logger.error("Permission download failed: %s", e)
         return None
 
 
@@ -300,32 +503,189 @@ def delete_permission_from_cloud(permission_id: int) -> bool:
     """
     Delete permission data from local cloud storage.
     
+    Idempotent, so a retried delete is harmless: a file that is already gone
+    counts as deleted, and the shard and index are still brought in line.
+    
     Args:
         permission_id (int): The unique identifier for the permission.
         
     Returns:
-        bool: True if deletion is successful, False otherwise.
+        bool: True if the data is no longer stored, False on error.
     """
     try:
-        storage_path = Path(LOCAL_STORAGE_PATH) / PERMISSIONS_BUCKET_NAME
-        file_name = f"perm_{permission_id}.json"
-        file_path = storage_path / file_name
+        file_path = f"{_get_permission_dir()}/perm_{permission_id}.json"
         
-        if not file_path.exists():
-            print(f"✗ Permission file not found: {file_path}")
-            return False
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            logger.debug("Permission file not found: %s", file_path)
         
-        os.remove(file_path)
+        _invalidate_download(permission_id)
+        _shard_append(permission_id, orjson.dumps({"id": permission_id, "deleted": True}), deleted=True)
         _remove_permission_from_metadata_index(permission_id)
         
-        print(f"✓ Permission data deleted successfully: {file_path}")
+        logger.debug("Permission data deleted: %s", file_path)
         return True
         
     except Exception as e:
-        print(f"✗ Permission deletion failed: {e}")
+        logger.error("Permission deletion failed: %s", e)
         return False
 
 
+def _scan_permission_files() -> Iterator[Dict[str, Any]]:
+    """
+    Yield every per-permission JSON file in the bucket, in directory order.
+    The files are read on the shared read pool so their I/O overlaps.
+    """
+    storage_path = _get_permission_dir()
+    try:
+        with os.scandir(storage_path) as entries:
+            file_paths = [entry.path for entry in entries if entry.name.endswith(".json") and entry.is_file()]
+    except FileNotFoundError:
+        return
+    
+    yield from _read_files(file_paths)
+
+
+def _repair_ndjson_tail(path: Path) -> None:
+    """
+    Make an NDJSON file end on a record boundary before appending to it.
+    
+    An unterminated last line that does not decode is a torn write and is
+    truncated away; one that does decode only lost its newline, which is added back.
+    
+    Raises:
+        FileNotFoundError: If the file does not exist.
+    """
+    with open(path, 'r+b') as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = mm.rfind(b"\n") + 1
+            tail = mm[start:]
+        try:
+            orjson.loads(tail)
+        except orjson.JSONDecodeError:
+            logger.warning("Dropping torn record at the end of %s", path)
+            f.truncate(start)
+        else:
+            f.write(b"\n")
+
+
+def _read_shard() -> tuple[Dict[int, Dict[str, Any]], int]:
+    """
+    Parse permissions.shard into the live records keyed by ID, plus its line count.
+    Later records for an ID replace earlier ones and tombstones drop it. A torn
+    final line, left by a process killed mid-append, is skipped.
+    
+    Raises:
+        FileNotFoundError: If no shard exists yet.
+    """
+    permissions: Dict[int, Dict[str, Any]] = {}
+    lines = 0
+    with open(_PERM_SHARD, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return permissions, lines
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for line in iter(mm.readline, b""):
+                if not line.strip():
+                    continue
+                try:
+                    record = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    # Only an unterminated last line can be a torn append
+                    if line.endswith(b"\n"):
+                        raise
+                    logger.warning("Skipping torn record at the end of %s", _PERM_SHARD)
+                    break
+                lines += 1
+                if record.get("deleted"):
+                    permissions.pop(record["id"], None)
+                else:
+                    permissions[record["id"]] = record
+    return permissions, lines
+
+
+def _write_shard(records: Iterable[Dict[str, Any]]) -> None:
+    """
+    Replace permissions.shard with one line per record, atomically, so unlocked
+    readers see either the old shard or the complete new one. Must be called
+    with _PERM_SHARD_LOCK held.
+    """
+    global _PERM_SHARD_IDS, _PERM_SHARD_LINES
+    payload = []
+    ids = set()
+    for record in records:
+        payload.append(orjson.dumps(record) + b"\n")
+        ids.add(record["id"])
+    _atomic_write(os.fspath(_PERM_SHARD), b"".join(payload))
+    _PERM_SHARD_IDS = ids
+    _PERM_SHARD_LINES = len(payload)
+
+
+def _shard_append(permission_id: int, record: bytes, deleted: bool = False) -> None:
+    """
+    Append one NDJSON record to permissions.shard with a single write.
+    
+    When the shard does not exist yet it is instead seeded from the per-permission
+    files in the bucket, so listings keep including older uploads. Callers write
+    or remove the per-permission file first, so the seed already reflects record.
+    Once dead lines outnumber live records, the shard is compacted the same way
+    as the index journal.
+    """
+    global _PERM_SHARD_IDS, _PERM_SHARD_LINES
+    with _PERM_SHARD_LOCK:
+        if _PERM_SHARD_IDS is None:
+            try:
+                _repair_ndjson_tail(_PERM_SHARD)
+                live, _PERM_SHARD_LINES = _read_shard()
+                _PERM_SHARD_IDS = set(live)
+            except FileNotFoundError:
+                _PERM_SHARD.parent.mkdir(parents=True, exist_ok=True)
+                _write_shard(_scan_permission_files())
+                return
+        
+        with open(_PERM_SHARD, 'ab') as f:
+            f.write(record + b"\n")
+        _PERM_SHARD_LINES += 1
+        if deleted:
+            _PERM_SHARD_IDS.discard(permission_id)
+        else:
+            _PERM_SHARD_IDS.add(permission_id)
+        
+        if _PERM_SHARD_LINES > max(2 * len(_PERM_SHARD_IDS), _PERM_COMPACT_MIN_LINES):
+            _write_shard(_read_shard()[0].values())
+
+
+def iter_permissions() -> Iterator[Dict[str, Any]]:
+    """
+    Yield the current permission data from local storage.
+    
+    Reads the memory-mapped permissions.shard; later records for an ID replace
+    earlier ones and tombstones drop it. Falls back to reading the individual
+    files when no shard exists.
+    
+    Returns:
+        Iterator[Dict[str, Any]]: Permission files metadata.
+    """
+    try:
+        permissions, _ = _read_shard()
+        for record in permissions.values():
+            yield _expand_permission_record(record)
+    except FileNotFoundError:
+        try:
+            for record in _scan_permission_files():
+                yield _expand_permission_record(record)
+        except Exception as e:
+            logger.error("Failed to list permissions: %s", e)
+    except Exception as e:
+        logger.error("Failed to list permissions: %s", e)
+
+
 def list_all_permissions() -> list[Dict[str, Any]]:
     """
     List all permission data from local storage.
@@ -333,29 +693,15 @@ def list_all_permissions() -> list[Dict[str, Any]]:
     Returns:
         list[Dict[str, Any]]: List of all permission files metadata.
     """
-    try:
-        storage_path = Path(LOCAL_STORAGE_PATH) / PERMISSIONS_BUCKET_NAME
-        
-        if not storage_path.exists():
-            return []
-        
-        files = []
-        for file_path in storage_path.glob("*.json"):
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-                files.append(data)
-        
-        print(f"✓ Found {len(files)} permission files")
-        return files
-        
-    except Exception as e:
-        print(f"✗ Failed to list permissions: {e}")
-        return []
+    files = list(iter_permissions())
+    logger.debug("Found %d permission files", len(files))
+    return files
 
 
 def update_permission_in_cloud(permission_data: Dict[str, Any], permission_id: int) -> bool:
     """
-    Update existing permission data in local cloud storage.
+    Update permission data in local cloud storage, creating the file if the
+    original upload never landed, so a revoke is always backed up.
     
     Args:
         permission_data (Dict[str, Any]): The updated permission data.
@@ -365,89 +711,188 @@ def update_permission_in_cloud(permission_data: Dict[str, Any], permission_id: i
         bool: True if update is successful, False otherwise.
     """
     try:
-        storage_path = Path(LOCAL_STORAGE_PATH) / PERMISSIONS_BUCKET_NAME
-        file_name = f"perm_{permission_id}.json"
-        file_path = storage_path / file_name
+        file_path = f"{_get_permission_dir()}/perm_{permission_id}.json"
         
-        if not file_path.exists():
-            print(f"✗ Permission file not found: {file_path}")
-            return False
+        created = not os.path.exists(file_path)
         
         # Add metadata
         upload_data = {
             "id": permission_id,
-            "user_id": permission_data.get("user_id"),
-            "machine_id": permission_data.get("machine_id"),
-            "digital_key_id": permission_data.get("digital_key_id"),
-            "permission_level": permission_data.get("permission_level"),
-            "is_active": permission_data.get("is_active"),
-            "updated_at": datetime.utcnow().isoformat(),
-            "original_data": permission_data
+            "updated_at": datetime.utcnow(),
+            "data": permission_data
         }
         
         # Write to local storage
-        with open(file_path, 'w') as f:
-            json.dump(upload_data, f, indent=2)
-        
-        print(f"✓ Permission data updated successfully in: {file_path}")
+        record = orjson.dumps(upload_data)
+        _atomic_write(file_path, record)
+        _invalidate_download(permission_id)
+        _shard_append(permission_id, record)
+        if created:
+            _update_permission_metadata_index(permission_id, file_path)
+        
+        logger.debug("Permission data updated in %s", file_path)
         return True
         
     except Exception as e:
-        print(f"✗ Permission update failed: {e}")
+        logger.error("Permission update failed: %s", e)
         return False
 
 
-def _update_permission_metadata_index(permission_id: int, file_path: str) -> None:
+def _load_permission_index() -> Dict[int, Dict[str, Any]]:
     """
-    Update metadata index for tracking uploaded permission files.
+    Return the in-memory permission index, replaying the journal on first use.
+    Must be called with _PERM_INDEX_LOCK held.
+    
+    A torn last journal line is dropped before replay. A legacy
+    permissions_index.json is imported once when no journal exists.
     """
-    try:
-        storage_path = Path(LOCAL_STORAGE_PATH) / PERMISSIONS_BUCKET_NAME / ".metadata"
-        storage_path.mkdir(parents=True, exist_ok=True)
-        index_file = storage_path / "permissions_index.json"
-        
-        # Load existing index
-        if index_file.exists():
-            with open(index_file, 'r') as f:
-                index = json.load(f)
+    global _PERM_INDEX, _PERM_JOURNAL_FP, _PERM_JOURNAL_LINES
+    if _PERM_INDEX is None:
+        _PERM_METADATA.mkdir(parents=True, exist_ok=True)
+        index: Dict[int, Dict[str, Any]] = {}
+        lines = 0
+        
+        if _PERM_JOURNAL.exists():
+            # A write cut short by a crash must not cost the whole index
+            _repair_ndjson_tail(_PERM_JOURNAL)
+            with open(_PERM_JOURNAL, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = orjson.loads(line)
+                    lines += 1
+                    if entry.get("deleted"):
+                        index.pop(entry["id"], None)
+                    else:
+                        index[entry["id"]] = entry
         else:
-            index = {"permissions": []}
-        
-        # Add entry if not exists
-        entry = {"id": permission_id, "file_path": file_path, "indexed_at": datetime.utcnow().isoformat()}
-        
-        # Remove old entry if exists
-        index["permissions"] = [p for p in index["permissions"] if p["id"] != permission_id]
-        index["permissions"].append(entry)
+            legacy_index = _PERM_METADATA / "permissions_index.json"
+            if legacy_index.exists():
+                with open(legacy_index, 'rb') as f:
+                    index = {entry["id"]: entry for entry in orjson.loads(f.read()).get("permissions", [])}
+        
+        _PERM_INDEX = index
+        _PERM_JOURNAL_LINES = lines
+        _PERM_JOURNAL_FP = open(_PERM_JOURNAL, 'ab', buffering=0)
+        if lines < len(index):
+            _compact_permission_index()
+    return _PERM_INDEX
+
+
+def _journal_append(entries: list[Dict[str, Any]]) -> None:
+    """
+    Append records to the permission index journal in a single write, compacting
+    it once dead lines outnumber live entries. Must be called with _PERM_INDEX_LOCK held.
+    """
+    global _PERM_JOURNAL_LINES
+    _PERM_JOURNAL_FP.write(b"".join(orjson.dumps(entry) + b"\n" for entry in entries))
+    _PERM_JOURNAL_LINES += len(entries)
+    if _PERM_JOURNAL_LINES > max(2 * len(_PERM_INDEX), _PERM_COMPACT_MIN_LINES):
+        _compact_permission_index()
+
+
+def _compact_permission_index() -> None:
+    """
+    Rewrite the journal with one line per live entry and swap it in atomically.
+    Must be called with _PERM_INDEX_LOCK held.
+    """
+    global _PERM_JOURNAL_FP, _PERM_JOURNAL_LINES
+    _atomic_write(os.fspath(_PERM_JOURNAL), b"".join(orjson.dumps(entry) + b"\n" for entry in _PERM_INDEX.values()))
+    
+    _PERM_JOURNAL_FP.close()
+    _PERM_JOURNAL_FP = open(_PERM_JOURNAL, 'ab', buffering=0)
+    _PERM_JOURNAL_LINES = len(_PERM_INDEX)
+
+
+class _IndexWriter:
+    """
+    Write-behind queue for permission index changes.
+    
+    A daemon thread applies queued changes to the in-memory index every
+    ~200 ms and appends the whole batch to the journal in one write. Pending
+    changes are flushed at interpreter exit.
+    """
+    
+    def __init__(self, interval: float = 0.2):
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+    
+    def submit(self, op: str, permission_id: int, file_path: Optional[str] = None) -> None:
+        """
+        Queue an index change: op is "put" (with file_path) or "delete".
+        """
+        if self._thread is None:
+            self._start()
+        self._queue.put((op, permission_id, file_path, datetime.utcnow()))
+    
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="perm-index-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush_and_stop)
+    
+    def _run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            self.flush()
+    
+    def flush(self) -> None:
+        """
+        Apply and persist every change queued so far.
+        """
+        batch = []
+        try:
+            while True:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        if not batch:
+            return
         
-        # Write updated index
-        with open(index_file, 'w') as f:
-            json.dump(index, f, indent=2)
-            
-    except Exception as e:
-        print(f"Failed to update permission metadata index: {e}")
+        try:
+            with _PERM_INDEX_LOCK:
+                index = _load_permission_index()
+                entries = []
+                for op, permission_id, file_path, indexed_at in batch:
+                    if op == "put":
+                        entry = {"id": permission_id, "file_path": file_path, "indexed_at": indexed_at}
+                        index[permission_id] = entry
+                        entries.append(entry)
+                    elif index.pop(permission_id, None) is not None:
+                        entries.append({"id": permission_id, "deleted": True})
+                if entries:
+                    _journal_append(entries)
+                
+        except Exception as e:
+            logger.error("Failed to write permission metadata index: %s", e)
+    
+    def flush_and_stop(self) -> None:
+        """
+        Stop the background thread and flush whatever is still queued.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+
+_PERM_INDEX_WRITER = _IndexWriter()
+
+
+def _update_permission_metadata_index(permission_id: int, file_path: str) -> None:
+    """
+    Update metadata index for tracking uploaded permission files.
+    The change is written behind by _PERM_INDEX_WRITER.
+    """
+    _PERM_INDEX_WRITER.submit("put", permission_id, file_path)
 
 
 def _remove_permission_from_metadata_index(permission_id: int) -> None:
     """
     Remove permission entry from metadata index.
+    The change is written behind by _PERM_INDEX_WRITER.
     """
-    try:
-        storage_path = Path(LOCAL_STORAGE_PATH) / PERMISSIONS_BUCKET_NAME / ".metadata"
-        index_file = storage_path / "permissions_index.json"
-        
-        if not index_file.exists():
-            return
-        
-        with open(index_file, 'r') as f:
-            index = json.load(f)
-        
-        # Remove entry
-        index["permissions"] = [p for p in index["permissions"] if p["id"] != permission_id]
-        
-        # Write updated index
-        with open(index_file, 'w') as f:
-            json.dump(index, f, indent=2)
-            
-    except Exception as e:
-        print(f"Failed to remove permission from metadata index: {e}")
\ No newline at end of file
+    _PERM_INDEX_WRITER.submit("delete", permission_id)
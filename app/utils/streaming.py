@@ -0,0 +1,18 @@
+from typing import Any, Iterable, Iterator
+import orjson
+
+
+def stream_json_array(items: Iterable[Any]) -> Iterator[bytes]:
+    """
+    Encode items as a JSON array one element at a time.
+    
+    Args:
+        items (Iterable[Any]): JSON-serializable items, typically a generator.
+        
+    Returns:
+        Iterator[bytes]: Chunks suitable for a StreamingResponse body.
+    """
+    yield b"["
+    for index, item in enumerate(items):
+        yield (b"," if index else b"") + orjson.dumps(item)
+    yield b"]"
@@ -0,0 +1,24 @@
+from typing import Any, Dict
+from pydantic import BaseModel
+
+
+def update_values(payload: BaseModel, model: type) -> Dict[str, Any]:
+    """
+    Build the SET values for a partial update from the fields the client sent.
+    
+    An explicit null clears a nullable column; for NOT NULL columns it is
+    treated as "not provided" so it cannot fail the UPDATE.
+    
+    Args:
+        payload (BaseModel): The update schema received by the endpoint.
+        model (type): The mapped model class being updated.
+        
+    Returns:
+        Dict[str, Any]: Column names mapped to their new values.
+    """
+    columns = model.__table__.columns
+    return {
+        field: value
+        for field, value in payload.model_dump(exclude_unset=True).items()
+        if value is not None or columns[field].nullable
+    }
@@ -5,6 +5,8 @@ Provides easy-to-use functions for managing database records
 
 import os
 import sys
+from types import MappingProxyType
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 from app.db.database import SessionLocal, engine
 from app.models.digital_key import DigitalKey, Base
@@ -12,17 +14,43 @@ from app.models.user import User
 from app.models.machine import Machine
 from app.models.permission import UserMachinePermission
 
-def clear_all_data():
+_ENTITY_MAP = MappingProxyType({
+    'digital_key': DigitalKey,
+    'user': User,
+    'machine': Machine,
+    'permission': UserMachinePermission,
+})
+_ENTITY_KEYS = ', '.join(_ENTITY_MAP)
+
+_TABLE_MAP = MappingProxyType({
+    'digital_keys': DigitalKey,
+    'users': User,
+    'machines': Machine,
+    'permissions': UserMachinePermission,
+})
+_TABLE_KEYS = ', '.join(_TABLE_MAP)
+
+def clear_all_data(db: Session | None = None):
     """Delete all records from all tables while preserving table structure"""
-    db = SessionLocal()
+    own_session = db is None
+    if own_session:
+        db = SessionLocal()
     try:
-        # Delete in order to respect foreign key constraints
-        deleted_permissions = db.query(UserMachinePermission).delete()
-        deleted_keys = db.query(DigitalKey).delete()
-        deleted_users = db.query(User).delete()
-        deleted_machines = db.query(Machine).delete()
-        
-        db.commit()
+        # One transaction for every table, so there is a single commit
+        with db.begin():
+            if engine.dialect.name == "postgresql":
+                tables = ", ".join(
+                    model.__tablename__ for model in (UserMachinePermission, DigitalKey, User, Machine)
+                )
+                db.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+                print("✓ Database cleared successfully (all tables truncated)!")
+                return
+            
+            # Delete in order to respect foreign key constraints
+            deleted_permissions = db.query(UserMachinePermission).delete(synchronize_session=False)
+            deleted_keys = db.query(DigitalKey).delete(synchronize_session=False)
+            deleted_users = db.query(User).delete(synchronize_session=False)
+            deleted_machines = db.query(Machine).delete(synchronize_session=False)
         
         print("✓ Database cleared successfully!")
         print(f"  - Permissions deleted: {deleted_permissions}")
@@ -31,19 +59,35 @@ def clear_all_data():
         print(f"  - Machines deleted: {deleted_machines}")
         
     except Exception as e:
-        db.rollback()
         print(f"✗ Error clearing database: {e}")
     finally:
-        db.close()
+        if own_session:
+            db.close()
 
 def reset_database():
     """Drop all tables and recreate them (hard reset)"""
     try:
         print("Resetting database...")
         
-        # Drop all tables
-        Base.metadata.drop_all(bind=engine)
-        print("✓ All tables dropped")
+        # Drop all tables, in a single statement where the dialect allows it
+        dialect = engine.dialect.name
+        if dialect == "postgresql":
+            with engine.begin() as conn:
+                conn.execute(text("DROP SCHEMA public CASCADE"))
+                conn.execute(text("CREATE SCHEMA public"))
+            print("✓ Schema public dropped and recreated")
+        elif dialect in ("mysql", "mariadb"):
+            tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+            with engine.begin() as conn:
+                conn.execute(text("SET FOREIGN_KEY_CHECKS=0"))
+                conn.execute(text(f"DROP TABLE IF EXISTS {tables}"))
+                conn.execute(text("SET FOREIGN_KEY_CHECKS=1"))
+            print("✓ All tables dropped")
+        else:
+            # SQLite drops in place: a running server keeps using the same file
+            # and sees the new schema, and drop_all costs no network round trips
+            Base.metadata.drop_all(bind=engine)
+            print("✓ All tables dropped")
         
         # Recreate all tables
         Base.metadata.create_all(bind=engine)
@@ -54,28 +98,22 @@ def reset_database():
     except Exception as e:
         print(f"✗ Error resetting database: {e}")
 
-def delete_by_id(entity_type: str, entity_id: int):
+def delete_by_id(entity_type: str, entity_id: int, db: Session | None = None):
     """Delete a specific record by ID"""
-    db = SessionLocal()
+    own_session = db is None
+    if own_session:
+        db = SessionLocal()
     try:
-        entity_map = {
-            'digital_key': DigitalKey,
-            'user': User,
-            'machine': Machine,
-            'permission': UserMachinePermission,
-        }
-        
-        if entity_type not in entity_map:
+        if entity_type not in _ENTITY_MAP:
             print(f"✗ Unknown entity type: {entity_type}")
-            print(f"  Available types: {', '.join(entity_map.keys())}")
+            print(f"  Available types: {_ENTITY_KEYS}")
             return
         
-        EntityClass = entity_map[entity_type]
-        entity = db.query(EntityClass).filter(EntityClass.id == entity_id).first()
+        EntityClass = _ENTITY_MAP[entity_type]
+        deleted = db.query(EntityClass).filter(EntityClass.id == entity_id).delete(synchronize_session=False)
+        db.commit()
         
-        if entity:
-            db.delete(entity)
-            db.commit()
+        if deleted:
             print(f"✓ {entity_type} {entity_id} deleted successfully")
         else:
             print(f"✗ {entity_type} {entity_id} not found")
@@ -84,26 +122,22 @@ def delete_by_id(entity_type: str, entity_id: int):
         db.rollback()
         print(f"✗ Error deleting {entity_type}: {e}")
     finally:
-        db.close()
+        if own_session:
+            db.close()
 
-def delete_table(table_name: str):
+def delete_table(table_name: str, db: Session | None = None):
     """Delete all records from a specific table"""
-    db = SessionLocal()
+    own_session = db is None
+    if own_session:
+        db = SessionLocal()
     try:
-        table_map = {
-            'digital_keys': DigitalKey,
-            'users': User,
-            'machines': Machine,
-            'permissions': UserMachinePermission,
-        }
-        
-        if table_name not in table_map:
+        if table_name not in _TABLE_MAP:
             print(f"✗ Unknown table: {table_name}")
-            print(f"  Available tables: {', '.join(table_map.keys())}")
+            print(f"  Available tables: {_TABLE_KEYS}")
             return
         
-        TableClass = table_map[table_name]
-        count = db.query(TableClass).delete()
+        TableClass = _TABLE_MAP[table_name]
+        count = db.query(TableClass).delete(synchronize_session=False)
         db.commit()
         
         print(f"✓ {count} records deleted from {table_name}")
@@ -112,13 +146,29 @@ def delete_table(table_name: str):
         db.rollback()
         print(f"✗ Error clearing table: {e}")
     finally:
-        db.close()
+        if own_session:
+            db.close()
 
 def delete_database_file():
-    """Delete the SQLite database file"""
+    """Delete the SQLite database file and its journal/WAL sidecar files.
+    
+    Stop the server first: a process that still has the database open keeps
+    writing to the unlinked file and its WAL, and those writes are lost.
+    """
     try:
-        if os.path.exists("digital_key.db"):
-            os.remove("digital_key.db")
+        db_path = engine.url.database
+        if engine.dialect.name != "sqlite" or not db_path or db_path == ":memory:":
+            print("✗ Database is not a SQLite file")
+            return
+        
+        # Close pooled connections so none keeps the unlinked file open
+        engine.dispose()
+        
+        if os.path.exists(db_path):
+            os.remove(db_path)
+            for suffix in ("-wal", "-shm", "-journal"):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
             print("✓ Database file deleted")
             print("  Note: Restart the server to recreate the database")
         else:
@@ -126,6 +176,37 @@ def delete_database_file():
     except Exception as e:
         print(f"✗ Error deleting database file: {e}")
 
+def _dispatch(line: str, db: Session):
+    """Run one script command line against a shared session"""
+    args = line.split()
+    if not args or args[0].startswith('#'):
+        return
+    
+    command = args[0].lower()
+    if command == "clear":
+        clear_all_data(db)
+    elif command == "delete" and len(args) == 3:
+        try:
+            delete_by_id(args[1], int(args[2]), db)
+        except ValueError:
+            print(f"✗ Invalid ID: {args[2]}")
+    elif command == "clear-table" and len(args) == 2:
+        delete_table(args[1], db)
+    else:
+        print(f"✗ Unsupported script command: {line}")
+
+def run_script(path: str):
+    """Replay a file of commands (clear / delete <type> <id> / clear-table <table>) over one session"""
+    with open(path) as f:
+        lines = f.read().splitlines()
+    
+    db = SessionLocal()
+    try:
+        for line in lines:
+            _dispatch(line, db)
+    finally:
+        db.close()
+
 def display_menu():
     """Display interactive menu"""
     while True:
@@ -210,17 +291,24 @@ if __name__ == "__main__":
             else:
                 print("Usage: python clear_database.py clear-table <table_name>")
                 
+        elif command == "script":
+            if len(sys.argv) > 2:
+                run_script(sys.argv[2])
+            else:
+                print("Usage: python clear_database.py script <commands_file>")
+                
         elif command == "menu":
             display_menu()
             
         else:
-            print("Usage: python clear_database.py [clear|reset|delete-file|delete|clear-table|menu]")
+            print("Usage: python clear_database.py [clear|reset|delete-file|delete|clear-table|script|menu]")
             print("\nExamples:")
             print("  python clear_database.py clear              - Clear all data")
             print("  python clear_database.py reset             - Reset database")
             print("  python clear_database.py delete user 5     - Delete user with ID 5")
             print("  python clear_database.py clear-table users - Delete all users")
             print("  python clear_database.py delete-file       - Delete database file")
+            print("  python clear_database.py script cmds.txt   - Run commands from a file in one session")
             print("  python clear_database.py menu              - Interactive menu")
     else:
         display_menu()
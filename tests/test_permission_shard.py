@@ -0,0 +1,43 @@
+import importlib
+import os
+import tempfile
+import unittest
+
+
+class TornShardTailTest(unittest.TestCase):
+    """A process killed mid-append must not break listings or later uploads."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        os.environ["LOCAL_STORAGE_PATH"] = self._tmp.name
+        import app.core.config
+        import app.utils.cloud
+        importlib.reload(app.core.config)
+        self.cloud = importlib.reload(app.utils.cloud)
+
+    def tearDown(self):
+        self.cloud._PERM_INDEX_WRITER.flush_and_stop()
+        self._tmp.cleanup()
+
+    def _simulate_restart(self):
+        self.cloud._PERM_SHARD_IDS = None
+        self.cloud._PERM_SHARD_LINES = 0
+
+    def test_partial_tail_is_skipped_and_repaired(self):
+        cloud = self.cloud
+        self.assertTrue(cloud.upload_permission_to_cloud({"user_id": 1}, 1))
+        self.assertTrue(cloud.upload_permission_to_cloud({"user_id": 2}, 2))
+        with open(cloud._PERM_SHARD, "ab") as f:
+            f.write(b'{"id":3,"uploaded_at":"2026-01-01T00:00:00","da')
+
+        self.assertEqual(sorted(p["id"] for p in cloud.list_all_permissions()), [1, 2])
+
+        self._simulate_restart()
+        self.assertTrue(cloud.upload_permission_to_cloud({"user_id": 4}, 4))
+        self.assertEqual(sorted(p["id"] for p in cloud.list_all_permissions()), [1, 2, 4])
+        with open(cloud._PERM_SHARD, "rb") as f:
+            self.assertTrue(all(line.endswith(b"\n") for line in f))
+
+
+if __name__ == "__main__":
+    unittest.main()